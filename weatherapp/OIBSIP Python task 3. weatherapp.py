@@ -1,15 +1,28 @@
 
 
-import tkinter as tk
-from tkinter import ttk, messagebox
-from PIL import Image, ImageTk
-import requests
+try:
+    import tkinter as tk
+    from tkinter import ttk, messagebox
+except ImportError:
+    # Headless hosts: weather_service.py only needs the fetch/cache layer.
+    tk = ttk = messagebox = None
+import heapq
+import importlib
 import io
+import json
+import math
+import os
+import random
+import socket
 import time
 import threading
-from datetime import datetime
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import date, datetime
+from urllib.parse import urlparse
+import telemetry
+from city_index import open_city_index
+from telemetry import span
 
 
 API_KEY = ""  
@@ -18,74 +31,658 @@ OWM_CURRENT_URL = "https://api.openweathermap.org/data/2.5/weather"
 OWM_FORECAST_URL = "https://api.openweathermap.org/data/2.5/forecast"
 OWM_ICON_URL = "http://openweathermap.org/img/wn/{icon}@2x.png"
 IP_GEO_URL = "https://ipapi.co/json/"
+APP_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache",
+                             "oibsip-weatherapp")
+ICON_CACHE_DIR = os.path.join(APP_CACHE_DIR, "icons")
+LAST_LOCATION_FILE = os.path.join(APP_CACHE_DIR, "last_location.json")
+METRICS_FILE = os.path.join(APP_CACHE_DIR, "metrics.prom")
+METRICS_INTERVAL_MS = 30000
+HISTORY_DIR = os.path.join(APP_CACHE_DIR, "history")
+HISTORY_BUDGET_BYTES = 256 * 2 ** 20
+HISTORY_MAINTENANCE_MS = 6 * 3600 * 1000
+# label -> (days, store resolution)
+HISTORY_RANGES = {"7d": (7, "hourly"), "30d": (30, "hourly"),
+                  "1y": (365, "daily")}
+# DNS is timed separately (getaddrinfo on a background thread, off the
+# request path) the first time a host is seen and then at most once per
+# interval, so "dns" and "http" can be told apart.
+DNS_SAMPLE_INTERVAL = 300
+
+# requests, PIL and matplotlib are imported on first use (or by the
+# background warm-up) so the window can appear before they load.
+WARMUP_MODULES = ("requests", "numpy", "PIL.Image", "PIL.ImageTk",
+                  "matplotlib.figure", "matplotlib.backends.backend_tkagg")
+
+# ttl: served without a request. stale: still served instantly while a
+# background revalidation runs. refresh_ahead/jitter: subscribed entries
+# are refreshed this long (minus up to jitter) before they expire.
+CACHE_POLICIES = {
+    "current": {"ttl": 300, "stale": 3600, "refresh_ahead": 30, "jitter": 20},
+    "forecast": {"ttl": 1800, "stale": 6 * 3600, "refresh_ahead": 120,
+                 "jitter": 60},
+    "geocode": {"ttl": 7 * 86400, "stale": 90 * 86400, "refresh_ahead": 3600,
+                "jitter": 600},
+}
+# Weather is cached per geohash cell (precision 6 is ~1.2 x 0.6 km) and a
+# miss may reuse a fresh entry from a neighbouring cell within this radius.
+GEOHASH_PRECISION = 6
+NEARBY_RADIUS_KM = 1.5
+# Free tier quota; every API call (searches, background refreshes and
+# batches) goes through api_quota, so no minute ever exceeds it.
+API_CALLS_PER_MINUTE = 60
+
+HOURLY_SLOTS = 8
+DAILY_ROWS = 7
 
 _cache = {}
+_stats = {"hits": 0, "nearby_hits": 0, "stale_hits": 0, "misses": 0,
+          "api_calls": 0}
+_stats_lock = threading.Lock()
+_dns_sampled = {}
+_history = None
+_history_lock = threading.Lock()
+_history_last = {}
+_icon_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="icon")
+
 
+def warm_up_imports():
+    for name in WARMUP_MODULES:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            pass
+
+def load_last_location():
+    try:
+        with open(LAST_LOCATION_FILE) as f:
+            last = json.load(f)
+        return {"lat": float(last["lat"]), "lon": float(last["lon"]),
+                "name": last.get("name")}
+    except Exception:
+        return None
+
+def remember_location(lat, lon, name):
+    _cache["last_location"] = {"lat": lat, "lon": lon, "name": name}
+    try:
+        os.makedirs(APP_CACHE_DIR, exist_ok=True)
+        with open(LAST_LOCATION_FILE, "w") as f:
+            json.dump(_cache["last_location"], f)
+    except OSError:
+        pass
+
+def _time_dns(host):
+    try:
+        with span("dns"):
+            socket.getaddrinfo(host, None)
+    except OSError:
+        pass
+
+def _sample_dns(url):
+    host = urlparse(url).hostname
+    now = time.time()
+    if not host or now - _dns_sampled.get(host, 0) < DNS_SAMPLE_INTERVAL:
+        return
+    _dns_sampled[host] = now
+    threading.Thread(target=_time_dns, args=(host,), daemon=True,
+                     name="dns-sample").start()
 
 def safe_get(url, params=None, timeout=10):
+    requests = importlib.import_module("requests")
+    _sample_dns(url)
     try:
-        r = requests.get(url, params=params, timeout=timeout)
-        r.raise_for_status()
+        with span("http"):
+            r = requests.get(url, params=params, timeout=timeout)
+            r.raise_for_status()
+        telemetry.observe("http.ttfb", r.elapsed.total_seconds())
         return r
     except Exception as e:
         raise RuntimeError(f"Network error: {e}")
 
-def geocode_city(city_name, limit=1):
-    params = {"q": city_name, "limit": limit, "appid": API_KEY}
-    r = safe_get(OWM_GEOCODE_URL, params=params)
-    data = r.json()
-    if not isinstance(data, list) or not data:
-        raise ValueError("City not found")
+def parse_json(response):
+    with span("json"):
+        return response.json()
+
+class RefreshScheduler:
+    # Background revalidation of cache entries. Any entry can be
+    # revalidated on demand; subscribed entries are also refreshed
+    # proactively before they expire and listeners hear about changes.
+    def __init__(self, policies, workers=4):
+        self.policies = policies
+        self._loaders = {}
+        self._listeners = {}
+        self._due = {}
+        self._heap = []
+        self._inflight = set()
+        self._cond = threading.Condition()
+        self._pool = ThreadPoolExecutor(max_workers=workers,
+                                        thread_name_prefix="refresh")
+        self._thread = None
+
+    def register(self, kind, cache_key, loader):
+        with self._cond:
+            self._loaders[cache_key] = (kind, loader)
+
+    def subscribe(self, cache_key, callback):
+        with self._cond:
+            self._listeners.setdefault(cache_key, []).append(callback)
+            self._schedule(cache_key)
+
+    def unsubscribe(self, cache_key, callback):
+        with self._cond:
+            listeners = self._listeners.get(cache_key, [])
+            if callback in listeners:
+                listeners.remove(callback)
+            if not listeners:
+                self._listeners.pop(cache_key, None)
+                self._due.pop(cache_key, None)
+
+    def keys(self):
+        with self._cond:
+            return list(self._loaders)
+
+    def drop(self, cache_key):
+        # Forgets a key entirely: loader, listeners and any pending refresh.
+        with self._cond:
+            self._loaders.pop(cache_key, None)
+            self._listeners.pop(cache_key, None)
+            self._due.pop(cache_key, None)
+
+    def revalidate(self, cache_key):
+        with self._cond:
+            if cache_key in self._loaders:
+                self._push(cache_key, time.time())
+
+    def _schedule(self, cache_key, retry_in=None):
+        if cache_key not in self._loaders:
+            return
+        kind, _ = self._loaders[cache_key]
+        policy = self.policies[kind]
+        if retry_in is not None:
+            due = time.time() + retry_in
+        else:
+            cached = _cache.get(cache_key)
+            ts = cached["ts"] if cached else 0
+            due = (ts + policy["ttl"] - policy["refresh_ahead"]
+                   - random.uniform(0, policy["jitter"]))
+        self._push(cache_key, due)
+
+    def _push(self, cache_key, due):
+        self._due[cache_key] = due
+        heapq.heappush(self._heap, (due, cache_key))
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True,
+                                            name="refresh-scheduler")
+            self._thread.start()
+        self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._heap or self._heap[0][0] > time.time():
+                    timeout = self._heap[0][0] - time.time() if self._heap else None
+                    self._cond.wait(timeout)
+                due, cache_key = heapq.heappop(self._heap)
+                if self._due.get(cache_key) != due or cache_key in self._inflight:
+                    continue
+                del self._due[cache_key]
+                self._inflight.add(cache_key)
+            self._pool.submit(self._refresh, cache_key)
+
+    def _refresh(self, cache_key):
+        with self._cond:
+            entry = self._loaders.get(cache_key)
+            if entry is None:
+                self._inflight.discard(cache_key)
+                return
+        kind, loader = entry
+        old = _cache.get(cache_key)
+        try:
+            count("api_calls")
+            api_quota.acquire()
+            data = loader()
+        except Exception:
+            data = None
+        with self._cond:
+            self._inflight.discard(cache_key)
+            failed = data is None
+            if not failed:
+                _cache[cache_key] = {"ts": time.time(), "data": data}
+            listeners = list(self._listeners.get(cache_key, []))
+            if listeners:
+                retry_in = self.policies[kind]["refresh_ahead"] if failed else None
+                self._schedule(cache_key, retry_in)
+        if not failed:
+            record_history(kind, cache_key, data)
+        if not failed and (old is None or old["data"] != data):
+            for callback in listeners:
+                callback(cache_key, data)
+
+refresher = RefreshScheduler(CACHE_POLICIES)
+
+class RateLimiter:
+    # Sliding one-minute window: a call may start only if fewer than
+    # calls_per_minute calls started in the window before it, which holds
+    # for any quota down to 1. Thread-safe and independent of any event
+    # loop, so one instance serves the whole module. The extra second
+    # absorbs jitter in when requests actually reach the server.
+    window = 61.0
+
+    def __init__(self, calls_per_minute):
+        self.calls_per_minute = calls_per_minute
+        self._starts = deque()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        # Books the next free start time and returns the wait until it.
+        with self._lock:
+            now = time.monotonic()
+            while self._starts and now - self._starts[0] >= self.window:
+                self._starts.popleft()
+            if len(self._starts) < self.calls_per_minute:
+                start = max(now, self._starts[-1]) if self._starts else now
+            else:
+                start = self._starts[-self.calls_per_minute] + self.window
+            self._starts.append(start)
+            return start - now
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+api_quota = RateLimiter(API_CALLS_PER_MINUTE)
+
+def count(stat, n=1):
+    with _stats_lock:
+        _stats[stat] += n
+
+def cache_report():
+    with _stats_lock:
+        report = dict(_stats)
+    served = report["hits"] + report["nearby_hits"] + report["stale_hits"]
+    lookups = served + report["misses"]
+    report["hit_rate"] = served / lookups if lookups else 0.0
+    # Stale hits still cost a background revalidation call.
+    report["api_calls_saved"] = report["hits"] + report["nearby_hits"]
+    return report
+
+def cached_fetch(kind, cache_key, loader, allow_stale=False):
+    refresher.register(kind, cache_key, loader)
+    policy = CACHE_POLICIES[kind]
+    cached = _cache.get(cache_key)
+    age = time.time() - cached["ts"] if cached else None
+    if cached and age < policy["ttl"]:
+        count("hits")
+        return cached["data"]
+    if cached and allow_stale and age < policy["stale"]:
+        count("stale_hits")
+        refresher.revalidate(cache_key)
+        return cached["data"]
+    count("misses")
+    count("api_calls")
+    api_quota.acquire()
+    data = loader()
+    _cache[cache_key] = {"ts": time.time(), "data": data}
+    record_history(kind, cache_key, data)
     return data
 
+def history_store():
+    global _history
+    with _history_lock:
+        if _history is None:
+            HistoryStore = importlib.import_module("history_store").HistoryStore
+            _history = HistoryStore(HISTORY_DIR, budget_bytes=HISTORY_BUDGET_BYTES)
+        return _history
+
+def record_history(kind, cache_key, data):
+    # Persist each new current/forecast payload (metric units) under its
+    # geohash cell; unchanged payloads are not written again.
+    if kind not in ("current", "forecast"):
+        return
+    _, cell, units = cache_key.split(":")
+    try:
+        if kind == "current":
+            items = [dict(data, dt=data.get("dt", int(time.time())))]
+        else:
+            items = data.get("list", [])
+        if not items:
+            return
+        temp = [i["main"]["temp"] for i in items]
+        wind = [i.get("wind", {}).get("speed", 0) for i in items]
+        if units == "imperial":
+            temp = [(t - 32) * 5 / 9 for t in temp]
+            wind = [w * 0.44704 for w in wind]
+        # Compared in metric, so the same observation fetched in both units
+        # is stored once.
+        marker = tuple((i["dt"], round(t, 1)) for i, t in zip(items, temp))
+        if _history_last.get((cell, kind)) == marker:
+            return
+        _history_last[(cell, kind)] = marker
+        values = {"temp": temp, "wind": wind,
+                  "humidity": [i["main"].get("humidity", 0) for i in items]}
+        if kind == "current":
+            feels = data["main"].get("feels_like", data["main"]["temp"])
+            values["feels_like"] = [(feels - 32) * 5 / 9 if units == "imperial"
+                                    else feels]
+        with span("history.append"):
+            history_store().append(cell, kind, [i["dt"] for i in items], **values)
+    except Exception:
+        pass
+
+def maintain_history():
+    try:
+        with span("history.maintain"):
+            history_store().maintain()
+    except Exception:
+        pass
+
+def geocode_city(city_name, limit=1, allow_stale=False):
+    def load():
+        params = {"q": city_name, "limit": limit, "appid": API_KEY}
+        r = safe_get(OWM_GEOCODE_URL, params=params)
+        data = parse_json(r)
+        if not isinstance(data, list) or not data:
+            raise ValueError("City not found")
+        return data
+    cache_key = f"geocode:{city_name.strip().lower()}:{limit}"
+    with span("fetch.geocode"):
+        return cached_fetch("geocode", cache_key, load, allow_stale)
+
 def ip_geolocation():
     try:
-        r = safe_get(IP_GEO_URL)
-        j = r.json()
+        with span("fetch.ip"):
+            r = safe_get(IP_GEO_URL)
+            j = parse_json(r)
         return {"lat": j.get("latitude"), "lon": j.get("longitude"),
                 "city": j.get("city"), "country": j.get("country_name")}
     except Exception:
         raise RuntimeError("Unable to determine location from IP")
 
-def fetch_current_weather(lat, lon, units="metric"):
-    cache_key = f"current:{lat}:{lon}:{units}"
-    cached = _cache.get(cache_key)
-    if cached and time.time() - cached["ts"] < 300:
-        return cached["data"]
-    params = {"lat": lat, "lon": lon, "units": units, "appid": API_KEY}
-    r = safe_get(OWM_CURRENT_URL, params=params)
-    data = r.json()
-    _cache[cache_key] = {"ts": time.time(), "data": data}
-    return data
+_GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
 
-def fetch_forecast(lat, lon, units="metric"):
-    cache_key = f"forecast:{lat}:{lon}:{units}"
+def geohash_bounds(lat, lon, precision=GEOHASH_PRECISION):
+    lat_lo, lat_hi, lon_lo, lon_hi = -90.0, 90.0, -180.0, 180.0
+    chars = []
+    bits = even = 0
+    for i in range(precision * 5):
+        if i % 2 == 0:
+            mid = (lon_lo + lon_hi) / 2
+            bit = lon >= mid
+            lon_lo, lon_hi = (mid, lon_hi) if bit else (lon_lo, mid)
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            bit = lat >= mid
+            lat_lo, lat_hi = (mid, lat_hi) if bit else (lat_lo, mid)
+        bits = (bits << 1) | bit
+        if i % 5 == 4:
+            chars.append(_GEOHASH_BASE32[bits])
+            bits = 0
+    return "".join(chars), (lat_lo, lat_hi, lon_lo, lon_hi)
+
+def geohash(lat, lon, precision=GEOHASH_PRECISION):
+    return geohash_bounds(lat, lon, precision)[0]
+
+def distance_km(lat1, lon1, lat2, lon2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 12742 * math.asin(math.sqrt(a))
+
+def snap_to_grid(lat, lon):
+    # Centre of the geohash cell containing (lat, lon); requests for any
+    # point in the cell share one cache entry.
+    cell, (lat_lo, lat_hi, lon_lo, lon_hi) = geohash_bounds(float(lat), float(lon))
+    return cell, round((lat_lo + lat_hi) / 2, 5), round((lon_lo + lon_hi) / 2, 5)
+
+def weather_cache_key(kind, lat, lon, units):
+    return f"{kind}:{geohash(float(lat), float(lon))}:{units}"
+
+def is_fresh(kind, cache_key):
     cached = _cache.get(cache_key)
-    if cached and time.time() - cached["ts"] < 300:
-        return cached["data"]
-    params = {"lat": lat, "lon": lon, "units": units, "appid": API_KEY}
-    r = safe_get(OWM_FORECAST_URL, params=params)
-    data = r.json()
-    _cache[cache_key] = {"ts": time.time(), "data": data}
-    return data
+    return bool(cached) and \
+        time.time() - cached["ts"] < CACHE_POLICIES[kind]["ttl"]
 
-def fetch_icon_image(icon_code, size=(64, 64)):
-    cache_key = f"icon:{icon_code}:{size}"
+def fresh_nearby_key(kind, lat, lon, units):
+    # The geohash grid is the spatial index: look in the eight cells around
+    # the point for a fresh entry whose cell centre is close enough.
+    _, (lat_lo, lat_hi, lon_lo, lon_hi) = geohash_bounds(lat, lon)
+    dlat, dlon = lat_hi - lat_lo, lon_hi - lon_lo
+    for i in (-1, 0, 1):
+        for j in (-1, 0, 1):
+            if i == j == 0:
+                continue
+            cell, clat, clon = snap_to_grid(
+                max(-90.0, min(90.0, (lat_lo + lat_hi) / 2 + i * dlat)),
+                ((lon_lo + lon_hi) / 2 + j * dlon + 180) % 360 - 180)
+            key = f"{kind}:{cell}:{units}"
+            if is_fresh(kind, key) and \
+                    distance_km(lat, lon, clat, clon) <= NEARBY_RADIUS_KM:
+                return key
+    return None
+
+def served_weather_key(kind, lat, lon, units):
+    # The entry _fetch_weather answers from: the point's own cell while it
+    # is fresh, else a fresh neighbouring cell, else the own cell again.
+    cache_key = weather_cache_key(kind, lat, lon, units)
+    if is_fresh(kind, cache_key):
+        return cache_key
+    return fresh_nearby_key(kind, float(lat), float(lon), units) or cache_key
+
+def _fetch_weather(kind, url, lat, lon, units, allow_stale):
+    cache_key = weather_cache_key(kind, lat, lon, units)
+    _, grid_lat, grid_lon = snap_to_grid(lat, lon)
+
+    def load():
+        params = {"lat": grid_lat, "lon": grid_lon, "units": units,
+                  "appid": API_KEY}
+        return parse_json(safe_get(url, params=params))
+    refresher.register(kind, cache_key, load)
+    if not is_fresh(kind, cache_key):
+        nearby = fresh_nearby_key(kind, float(lat), float(lon), units)
+        if nearby:
+            count("nearby_hits")
+            return _cache[nearby]["data"]
+    with span(f"fetch.{kind}"):
+        return cached_fetch(kind, cache_key, load, allow_stale)
+
+def fetch_current_weather(lat, lon, units="metric", allow_stale=False):
+    return _fetch_weather("current", OWM_CURRENT_URL, lat, lon, units,
+                          allow_stale)
+
+def fetch_forecast(lat, lon, units="metric", allow_stale=False):
+    return _fetch_weather("forecast", OWM_FORECAST_URL, lat, lon, units,
+                          allow_stale)
+
+async def fetch_many_async(locations, units="metric", max_concurrency=8,
+                           on_result=None):
+    # locations: dicts with lat, lon and optional name / priority (lower
+    # runs first). API calls wait on the shared api_quota in the pool
+    # threads; fresh cache hits return without waiting.
+    asyncio = importlib.import_module("asyncio")
+    queue = asyncio.PriorityQueue()
+    for i, loc in enumerate(locations):
+        queue.put_nowait((loc.get("priority", 1), i, loc))
+    results = [None] * len(locations)
+    loop = asyncio.get_running_loop()
+    pool = ThreadPoolExecutor(max_workers=2 * max_concurrency,
+                              thread_name_prefix="batch")
+
+    async def worker():
+        while not queue.empty():
+            _, i, loc = queue.get_nowait()
+            lat, lon = loc["lat"], loc["lon"]
+            result = {"name": loc.get("name"), "lat": lat, "lon": lon,
+                      "current": None, "forecast": None, "error": None}
+            try:
+                result["current"], result["forecast"] = await asyncio.gather(
+                    loop.run_in_executor(pool, fetch_current_weather, lat, lon,
+                                         units),
+                    loop.run_in_executor(pool, fetch_forecast, lat, lon, units))
+            except Exception as e:
+                result["error"] = str(e)
+            results[i] = result
+            if on_result:
+                on_result(result)
+
+    try:
+        workers = min(max_concurrency, len(locations))
+        await asyncio.gather(*(worker() for _ in range(workers)))
+    finally:
+        pool.shutdown(wait=False)
+    return results
+
+def fetch_many(locations, units="metric", max_concurrency=8, on_result=None):
+    asyncio = importlib.import_module("asyncio")
+    return asyncio.run(fetch_many_async(locations, units, max_concurrency,
+                                        on_result))
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+def _hour_label(local_ts, sep=" "):
+    hour = int(local_ts) % 86400 // 3600
+    return f"{hour % 12 or 12:02d}{sep}{'AM' if hour < 12 else 'PM'}"
+
+class ForecastTable:
+    # The 3-hourly forecast parsed once into typed columns. `loc` numbers
+    # the location each row belongs to, so tables for several locations can
+    # be concatenated and grouped the same way as a single one.
+    COLUMNS = ("loc", "dt", "local", "day", "temp", "humidity", "wind",
+               "icon", "desc")
+
+    def __init__(self, **columns):
+        for name in self.COLUMNS:
+            setattr(self, name, columns[name])
+
+    @classmethod
+    def from_json(cls, forecast, loc=0):
+        np = importlib.import_module("numpy")
+        items = forecast.get("list", [])
+        n = len(items)
+        dt = np.fromiter((i["dt"] for i in items), dtype=np.int64, count=n)
+        temp = np.fromiter((i["main"]["temp"] for i in items),
+                           dtype=np.float32, count=n)
+        humidity = np.fromiter((i["main"].get("humidity", 0) for i in items),
+                               dtype=np.float32, count=n)
+        wind = np.fromiter((i.get("wind", {}).get("speed", 0) for i in items),
+                           dtype=np.float32, count=n)
+        weather = [i["weather"][0] for i in items]
+        icon = np.array([w.get("icon") or "" for w in weather], dtype="U4")
+        desc = np.array([w.get("description", "") for w in weather], dtype=object)
+        # Local-time offset: one lookup unless a DST switch falls inside.
+        offsets = {time.localtime(int(t)).tm_gmtoff for t in dt[[0, -1]]} if n else {0}
+        if len(offsets) == 1:
+            local = dt + offsets.pop()
+        else:
+            local = dt + np.array([time.localtime(int(t)).tm_gmtoff for t in dt])
+        return cls(loc=np.full(n, loc, dtype=np.int32), dt=dt, local=local,
+                   day=(local // 86400).astype(np.int32), temp=temp,
+                   humidity=humidity, wind=wind, icon=icon, desc=desc)
+
+    @classmethod
+    def concat(cls, tables):
+        np = importlib.import_module("numpy")
+        return cls(**{name: np.concatenate([getattr(t, name) for t in tables])
+                      for name in cls.COLUMNS})
+
+    def __len__(self):
+        return len(self.dt)
+
+    def hourly(self, n=HOURLY_SLOTS):
+        return ForecastTable(**{name: getattr(self, name)[:n]
+                                for name in self.COLUMNS})
+
+    def hour_labels(self, sep=" "):
+        return [_hour_label(t, sep) for t in self.local]
+
+    def daily(self, limit=None):
+        # Rows are grouped by (loc, local day); each group is contiguous
+        # because rows are time-ordered per location.
+        np = importlib.import_module("numpy")
+        if not len(self):
+            return []
+        change = (np.diff(self.day) != 0) | (np.diff(self.loc) != 0)
+        starts = np.concatenate(([0], np.flatnonzero(change) + 1))
+        counts = np.diff(np.append(starts, len(self)))
+        tmin = np.minimum.reduceat(self.temp, starts)
+        tmax = np.maximum.reduceat(self.temp, starts)
+        tmean = np.add.reduceat(self.temp, starts) / counts
+        humidity = np.add.reduceat(self.humidity, starts) / counts
+        wind_max = np.maximum.reduceat(self.wind, starts)
+        days = []
+        for k, start in enumerate(starts[:limit]):
+            days.append({
+                "loc": int(self.loc[start]),
+                "date": date.fromordinal(int(self.day[start]) + _EPOCH_ORDINAL),
+                "tmin": float(tmin[k]), "tmax": float(tmax[k]),
+                "tmean": float(tmean[k]), "humidity": float(humidity[k]),
+                "wind_max": float(wind_max[k]),
+                "icon": str(self.icon[start]), "desc": self.desc[start],
+            })
+        return days
+
+def _layout_key(ax):
+    key = [ax.get_xlabel(), ax.get_ylabel()]
+    for axis in (ax.xaxis, ax.yaxis):
+        lo, hi = sorted(axis.get_view_interval())
+        ticks = [t for t in axis.get_majorticklocs() if lo <= t <= hi]
+        key.append(tuple(axis.get_major_formatter().format_ticks(ticks)))
+    return tuple(key)
+
+def load_icon_image(icon_code, size=(64, 64)):
+    # Runs on the icon pool: disk cache, else download + decode + resize.
+    cache_key = f"iconsrc:{icon_code}:{size}"
     if cache_key in _cache:
         return _cache[cache_key]["img"]
-    url = OWM_ICON_URL.format(icon=icon_code)
+    path = os.path.join(ICON_CACHE_DIR, f"{icon_code}_{size[0]}x{size[1]}.png")
     try:
-        r = safe_get(url)
-        image = Image.open(io.BytesIO(r.content)).convert("RGBA")
-        image = image.resize(size, Image.LANCZOS)
-        imgtk = ImageTk.PhotoImage(image)
-        _cache[cache_key] = {"ts": time.time(), "img": imgtk}
-        return imgtk
+        Image = importlib.import_module("PIL.Image")
+        if os.path.exists(path):
+            with span("icon.disk"):
+                image = Image.open(path).convert("RGBA")
+        else:
+            with span("icon.download"):
+                r = safe_get(OWM_ICON_URL.format(icon=icon_code))
+            with span("icon.decode"):
+                image = Image.open(io.BytesIO(r.content)).convert("RGBA")
+                image = image.resize(size, Image.LANCZOS)
+            os.makedirs(ICON_CACHE_DIR, exist_ok=True)
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            image.save(tmp, "PNG")
+            os.replace(tmp, path)
+        _cache[cache_key] = {"ts": time.time(), "img": image}
+        return image
     except Exception:
         return None
 
+def prefetch_icons(current, table, timeout=15):
+    wanted = set()
+    icon = current.get("weather", [{}])[0].get("icon")
+    if icon:
+        wanted.add((icon, (100, 100)))
+    wanted.update((str(icon), (50, 50)) for icon in table.icon[:HOURLY_SLOTS])
+    wanted.update((day["icon"], (40, 40)) for day in table.daily(DAILY_ROWS))
+    wanted = {(code, size) for code, size in wanted if code}
+    futures = [_icon_pool.submit(load_icon_image, code, size)
+               for code, size in wanted
+               if f"icon:{code}:{size}" not in _cache]
+    wait(futures, timeout=timeout)
+
+def fetch_icon_image(icon_code, size=(64, 64)):
+    # Main thread only: wraps an image already prepared by prefetch_icons.
+    cache_key = f"icon:{icon_code}:{size}"
+    if cache_key in _cache:
+        return _cache[cache_key]["img"]
+    src = _cache.get(f"iconsrc:{icon_code}:{size}")
+    if not src:
+        return None
+    ImageTk = importlib.import_module("PIL.ImageTk")
+    with span("icon.photo"):
+        imgtk = ImageTk.PhotoImage(src["img"])
+    _cache[cache_key] = {"ts": time.time(), "img": imgtk}
+    return imgtk
+
 
-class WeatherApp(tk.Tk):
+class WeatherApp(tk.Tk if tk else object):
     def __init__(self):
         super().__init__()
         self.title("Weather App")
@@ -105,9 +702,18 @@ class WeatherApp(tk.Tk):
         self.units = tk.StringVar(value="metric")
         self.location_label = tk.StringVar(value="")
         self.status_text = tk.StringVar(value="Search for a city or use your location")
+        self._view = None
+        self._followed = None
+        self._followed_name = None
+        self._history_cell = None
+        self.history_range = tk.StringVar(value="7d")
+        self.city_index = open_city_index()
+        self._suggestions = []
         
         self._setup_styles()
         self._build_ui()
+        self.after_idle(self._staged_startup)
+        self.after(METRICS_INTERVAL_MS, self._export_metrics)
 
     def _setup_styles(self):
         style = ttk.Style()
@@ -172,6 +778,18 @@ class WeatherApp(tk.Tk):
         self.city_entry.bind("<FocusIn>", self._on_entry_focus_in)
         self.city_entry.bind("<FocusOut>", self._on_entry_focus_out)
         self.city_entry.bind("<Return>", lambda e: self.fetch_by_city())
+        self.city_entry.bind("<KeyRelease>", self._on_entry_key)
+        self.city_entry.bind("<Down>", self._focus_suggestions)
+        self.city_entry.bind("<Escape>", lambda e: self._hide_suggestions())
+        
+        self.suggest_box = tk.Listbox(self, font=('Segoe UI', 11),
+                                      relief='flat', bd=1, height=6,
+                                      activestyle='none',
+                                      highlightthickness=0,
+                                      selectbackground=self.accent)
+        self.suggest_box.bind("<ButtonRelease-1>", self._pick_suggestion)
+        self.suggest_box.bind("<Return>", self._pick_suggestion)
+        self.suggest_box.bind("<Escape>", lambda e: self._hide_suggestions())
         
         btn_search = tk.Button(search_inner, text="Search", 
                               command=self.fetch_by_city,
@@ -210,6 +828,11 @@ class WeatherApp(tk.Tk):
                             fg='#ecf0f1')
         status_lbl.pack(pady=(0, 10))
         
+        # F12: per-stage latency overlay
+        self._overlay = tk.Label(self, font=('Consolas', 9), justify=tk.LEFT,
+                                 bg='#1b1b1b', fg='#9be79b', padx=8, pady=6)
+        self.bind("<F12>", self._toggle_debug_overlay)
+        
         canvas = tk.Canvas(content, bg=self.bg_gradient_bot, 
                           highlightthickness=0)
         scrollbar = ttk.Scrollbar(content, orient="vertical", 
@@ -248,6 +871,57 @@ class WeatherApp(tk.Tk):
         if not self.city_entry.get():
             self.city_entry.insert(0, "Enter city name...")
             self.city_entry.config(fg=self.text_light)
+        # Delay so a click on a suggestion still lands before it is hidden.
+        self.after(150, self._hide_suggestions_unless_focused)
+
+    def _on_entry_key(self, event):
+        if event.keysym in ("Return", "Down", "Up", "Escape", "Tab"):
+            return
+        text = self.city_entry.get().strip()
+        if not self.city_index or not text or text == "Enter city name...":
+            self._hide_suggestions()
+            return
+        self._suggestions = self.city_index.complete(text, limit=6)
+        if not self._suggestions:
+            self._hide_suggestions()
+            return
+        self.suggest_box.delete(0, tk.END)
+        for city in self._suggestions:
+            self.suggest_box.insert(tk.END, city["label"])
+        self.suggest_box.config(height=len(self._suggestions))
+        self.suggest_box.place(in_=self.city_entry, relx=0, rely=1,
+                               relwidth=1, y=2)
+        self.suggest_box.lift()
+
+    def _focus_suggestions(self, event):
+        if self._suggestions and self.suggest_box.winfo_ismapped():
+            self.suggest_box.focus_set()
+            self.suggest_box.selection_clear(0, tk.END)
+            self.suggest_box.selection_set(0)
+            self.suggest_box.activate(0)
+        return "break"
+
+    def _hide_suggestions(self):
+        self.suggest_box.place_forget()
+
+    def _hide_suggestions_unless_focused(self):
+        if self.focus_get() is not self.suggest_box:
+            self._hide_suggestions()
+
+    def _pick_suggestion(self, event):
+        sel = self.suggest_box.curselection()
+        if not sel:
+            return
+        city = self._suggestions[sel[0]]
+        self._hide_suggestions()
+        self.city_entry.delete(0, tk.END)
+        self.city_entry.insert(0, city["label"])
+        self.city_entry.config(fg=self.text_dark)
+        self.city_entry.focus_set()
+        self.status_text.set("Fetching weather...")
+        threading.Thread(target=self._fetch_for_city,
+                         args=(city["lat"], city["lon"], city["label"]),
+                         daemon=True).start()
 
     def _set_units(self, unit):
         self.units.set(unit)
@@ -263,6 +937,28 @@ class WeatherApp(tk.Tk):
                                    font=('Segoe UI', 10))
         threading.Thread(target=self._refetch_current_if_any, daemon=True).start()
 
+    def _staged_startup(self):
+        last = load_last_location()
+        if last:
+            _cache["last_location"] = last
+            if last.get("name"):
+                self.city_entry.delete(0, tk.END)
+                self.city_entry.insert(0, last["name"].split(",")[0])
+                self.city_entry.config(fg=self.text_dark)
+            self.status_text.set(f"Loading {last.get('name') or 'last location'}...")
+        threading.Thread(target=self._warm_up_and_refetch, daemon=True).start()
+
+    def _warm_up_and_refetch(self):
+        warm_up_imports()
+        self._refetch_current_if_any()
+        self._maintain_history()
+
+    def _maintain_history(self):
+        maintain_history()
+        self.after(HISTORY_MAINTENANCE_MS,
+                   lambda: threading.Thread(target=self._maintain_history,
+                                            daemon=True).start())
+
     def _refetch_current_if_any(self):
         last = _cache.get("last_location")
         if last:
@@ -276,6 +972,7 @@ class WeatherApp(tk.Tk):
         if not city or city == "Enter city name...":
             messagebox.showinfo("Input", "Please enter a city name")
             return
+        self._hide_suggestions()
         self.status_text.set("Looking up city...")
         threading.Thread(target=self._do_geocode_and_fetch, args=(city,), daemon=True).start()
 
@@ -285,21 +982,28 @@ class WeatherApp(tk.Tk):
 
     def _do_geocode_and_fetch(self, city):
         try:
-            results = geocode_city(city)
-            r = results[0]
-            lat, lon = r["lat"], r["lon"]
-            name = f"{r.get('name')}, {r.get('country')}"
-            _cache["last_location"] = {"lat": lat, "lon": lon, "name": name}
-            self._update_weather_for(lat, lon, name)
+            local = self.city_index.resolve(city) if self.city_index else None
+            if local:
+                lat, lon, name = local["lat"], local["lon"], local["label"]
+            else:
+                results = geocode_city(city, allow_stale=True)
+                r = results[0]
+                lat, lon = r["lat"], r["lon"]
+                name = f"{r.get('name')}, {r.get('country')}"
+            self._fetch_for_city(lat, lon, name)
         except Exception as e:
             self.status_text.set(f"Error: {e}")
 
+    def _fetch_for_city(self, lat, lon, name):
+        remember_location(lat, lon, name)
+        self._update_weather_for(lat, lon, name)
+
     def _do_ip_and_fetch(self):
         try:
             loc = ip_geolocation()
             lat, lon = float(loc["lat"]), float(loc["lon"])
             name = f"{loc.get('city')}, {loc.get('country')}"
-            _cache["last_location"] = {"lat": lat, "lon": lon, "name": name}
+            remember_location(lat, lon, name)
             self._update_weather_for(lat, lon, name)
         except Exception as e:
             self.status_text.set(f"Location error: {e}")
@@ -308,227 +1012,467 @@ class WeatherApp(tk.Tk):
         try:
             units = self.units.get()
             self.status_text.set("Fetching weather...")
-            current = fetch_current_weather(lat, lon, units)
-            forecast = fetch_forecast(lat, lon, units)
-            self.after(0, lambda: self._render_weather(current, forecast, display_name))
+            current = fetch_current_weather(lat, lon, units, allow_stale=True)
+            forecast = fetch_forecast(lat, lon, units, allow_stale=True)
+            self._follow_location(lat, lon, units, display_name)
+            self._show_weather(current, forecast, display_name)
         except Exception as e:
             self.status_text.set(f"Weather fetch error: {e}")
 
-    def _render_weather(self, current, forecast, display_name):
+    def _follow_location(self, lat, lon, units, display_name):
+        # Keep the entries actually shown (possibly a neighbouring cell's)
+        # refreshed in the background and re-render only when a refresh
+        # brings different data.
+        keys = (served_weather_key("current", lat, lon, units),
+                served_weather_key("forecast", lat, lon, units))
+        if self._followed == keys:
+            self._followed_name = display_name
+            return
+        for key in self._followed or ():
+            refresher.unsubscribe(key, self._on_refreshed)
+        self._followed = keys
+        self._followed_name = display_name
+        self._history_cell = keys[0].split(":")[1]
+        for key in keys:
+            refresher.subscribe(key, self._on_refreshed)
+
+    def _on_refreshed(self, cache_key, data):
+        if not self._followed or cache_key not in self._followed:
+            return
+        current = _cache.get(self._followed[0])
+        forecast = _cache.get(self._followed[1])
+        if current and forecast:
+            self._show_weather(current["data"], forecast["data"],
+                               self._followed_name)
+
+    def _show_weather(self, current, forecast, display_name):
+        with span("parse.forecast"):
+            table = ForecastTable.from_json(forecast)
+        prefetch_icons(current, table)
+        self.after(0, lambda: self._render_weather(current, table, display_name))
+
+    def watch_locations(self, locations):
+        threading.Thread(target=self._fetch_watched, args=(locations,),
+                         daemon=True).start()
 
-        for widget in self.weather_container.winfo_children():
-            widget.destroy()
+    def _fetch_watched(self, locations):
+        visible = _cache.get("last_location")
+        if not visible:
+            first = locations[0]
+            remember_location(first["lat"], first["lon"], first.get("name"))
+            visible = _cache["last_location"]
+        jobs = []
+        for loc in locations:
+            is_visible = (loc["lat"], loc["lon"]) == (visible["lat"], visible["lon"])
+            jobs.append(dict(loc, priority=0 if is_visible else 1))
+        done = []
+
+        def on_result(result):
+            done.append(result)
+            self.status_text.set(f"Updated {len(done)}/{len(jobs)} locations")
+            if (result["lat"], result["lon"]) == (visible["lat"], visible["lon"]) \
+                    and not result["error"]:
+                threading.Thread(target=self._show_weather,
+                                 args=(result["current"], result["forecast"],
+                                       visible.get("name")),
+                                 daemon=True).start()
+
+        self.status_text.set(f"Fetching {len(jobs)} locations...")
+        results = fetch_many(jobs, self.units.get(), on_result=on_result)
+        failed = sum(1 for r in results if r["error"])
+        report = cache_report()
+        self.status_text.set(f"Updated {len(results) - failed}/{len(results)}"
+                             f" locations ({failed} failed) • cache hit rate"
+                             f" {report['hit_rate']:.0%},"
+                             f" {report['api_calls_saved']} API calls saved")
+
+    def _build_weather_view(self):
+        Figure = importlib.import_module("matplotlib.figure").Figure
+        FigureCanvasTkAgg = importlib.import_module(
+            "matplotlib.backends.backend_tkagg").FigureCanvasTkAgg
+        view = {}
+        
+        current_card = tk.Frame(self.weather_container, bg=self.card_bg,
+                               relief='flat', bd=0)
+        current_card.pack(fill=tk.X, padx=20, pady=(0, 15))
         
-        try:
-            unit_sym = "°C" if self.units.get() == "metric" else "°F"
-            speed_unit = "m/s" if self.units.get() == "metric" else "mph"
-            
-            current_card = tk.Frame(self.weather_container, bg=self.card_bg,
-                                   relief='flat', bd=0)
-            current_card.pack(fill=tk.X, padx=20, pady=(0, 15))
-            
 
-            loc_frame = tk.Frame(current_card, bg=self.card_bg)
-            loc_frame.pack(fill=tk.X, padx=25, pady=(20, 10))
-            
-            tk.Label(loc_frame, text=display_name or "Location",
-                    font=('Segoe UI', 20, 'bold'),
-                    bg=self.card_bg, fg=self.text_dark).pack(anchor=tk.W)
-            
-            tk.Label(loc_frame, 
-                    text=datetime.now().strftime("%A, %B %d, %Y • %I:%M %p"),
-                    font=('Segoe UI', 10),
-                    bg=self.card_bg, fg=self.text_light).pack(anchor=tk.W)
+        loc_frame = tk.Frame(current_card, bg=self.card_bg)
+        loc_frame.pack(fill=tk.X, padx=25, pady=(20, 10))
+        
+        view["name"] = tk.Label(loc_frame, font=('Segoe UI', 20, 'bold'),
+                                bg=self.card_bg, fg=self.text_dark)
+        view["name"].pack(anchor=tk.W)
+        
+        view["date"] = tk.Label(loc_frame, font=('Segoe UI', 10),
+                                bg=self.card_bg, fg=self.text_light)
+        view["date"].pack(anchor=tk.W)
+        
+
+        main_frame = tk.Frame(current_card, bg=self.card_bg)
+        main_frame.pack(fill=tk.X, padx=25, pady=(10, 20))
+        
+
+        left_frame = tk.Frame(main_frame, bg=self.card_bg)
+        left_frame.pack(side=tk.LEFT)
+        
+        view["icon"] = tk.Label(left_frame, bg=self.card_bg)
+        view["icon"].pack(side=tk.LEFT)
+        
+        temp_frame = tk.Frame(left_frame, bg=self.card_bg)
+        temp_frame.pack(side=tk.LEFT, padx=(10, 0))
+        
+        view["temp"] = tk.Label(temp_frame, font=('Segoe UI', 56, 'bold'),
+                                bg=self.card_bg, fg=self.text_dark)
+        view["temp"].pack(anchor=tk.W)
+        
+        view["desc"] = tk.Label(temp_frame, font=('Segoe UI', 16),
+                                bg=self.card_bg, fg=self.text_light)
+        view["desc"].pack(anchor=tk.W)
+        
+        # Right: Details
+        details_frame = tk.Frame(main_frame, bg=self.card_bg)
+        details_frame.pack(side=tk.RIGHT, padx=(30, 0))
+        
+        view["feels"] = self._add_detail(details_frame, "Feels like", "")
+        view["humidity"] = self._add_detail(details_frame, "Humidity", "")
+        view["wind"] = self._add_detail(details_frame, "Wind", "")
+        
+
+        hourly_card = tk.Frame(self.weather_container, bg=self.card_bg)
+        hourly_card.pack(fill=tk.X, padx=20, pady=(0, 15))
+        
+        tk.Label(hourly_card, text="Hourly Forecast",
+                font=('Segoe UI', 14, 'bold'),
+                bg=self.card_bg, fg=self.text_dark).pack(anchor=tk.W, 
+                                                          padx=25, pady=(15, 10))
+        
+
+        hourly_canvas = tk.Canvas(hourly_card, bg=self.card_bg, 
+                                 height=140, highlightthickness=0)
+        hourly_inner = tk.Frame(hourly_canvas, bg=self.card_bg)
+        
+        hourly_canvas.create_window((0, 0), window=hourly_inner, anchor="nw")
+        hourly_canvas.pack(fill=tk.X, padx=25, pady=(0, 15))
+        view["hourly_canvas"] = hourly_canvas
+        view["hourly_inner"] = hourly_inner
+        
+        view["hourly"] = []
+        for _ in range(HOURLY_SLOTS):
+            hour_frame = tk.Frame(hourly_inner, bg='#f8f9fa', 
+                                 width=90, height=120)
+            hour_frame.pack_propagate(False)
             
+            slot = {"frame": hour_frame}
+            slot["time"] = tk.Label(hour_frame, font=('Segoe UI', 9),
+                                    bg='#f8f9fa', fg=self.text_light)
+            slot["time"].pack(pady=(8, 0))
+            slot["icon"] = tk.Label(hour_frame, bg='#f8f9fa')
+            slot["icon"].pack()
+            slot["temp"] = tk.Label(hour_frame, font=('Segoe UI', 11, 'bold'),
+                                    bg='#f8f9fa', fg=self.text_dark)
+            slot["temp"].pack()
+            view["hourly"].append(slot)
+        
+        # Temperature chart
+        chart_card = tk.Frame(self.weather_container, bg=self.card_bg)
+        chart_card.pack(fill=tk.X, padx=20, pady=(0, 15))
+        
+        tk.Label(chart_card, text="Temperature Trend",
+                font=('Segoe UI', 14, 'bold'),
+                bg=self.card_bg, fg=self.text_dark).pack(anchor=tk.W,
+                                                          padx=25, pady=(15, 10))
+        
+        fig = Figure(figsize=(7.5, 2.5), dpi=100, facecolor=self.card_bg)
+        ax = fig.add_subplot(111)
+        line, = ax.plot([], [], marker='o', 
+                        color=self.accent, linewidth=2, markersize=6)
+        ax.grid(True, linestyle=':', alpha=0.3)
+        ax.set_facecolor('#f8f9fa')
+        
+        chart_widget = FigureCanvasTkAgg(fig, master=chart_card)
+        draw = chart_widget.draw
 
-            main_frame = tk.Frame(current_card, bg=self.card_bg)
-            main_frame.pack(fill=tk.X, padx=25, pady=(10, 20))
+        def timed_draw():
+            with span("chart.draw"):
+                draw()
+        chart_widget.draw = timed_draw
+        chart_widget.get_tk_widget().pack(padx=25, pady=(0, 15))
+        view["chart"] = {"fig": fig, "ax": ax, "line": line,
+                         "canvas": chart_widget, "layout": None}
+        
+
+        daily_card = tk.Frame(self.weather_container, bg=self.card_bg)
+        daily_card.pack(fill=tk.X, padx=20, pady=(0, 20))
+        
+        tk.Label(daily_card, text="7-Day Forecast",
+                font=('Segoe UI', 14, 'bold'),
+                bg=self.card_bg, fg=self.text_dark).pack(anchor=tk.W,
+                                                          padx=25, pady=(15, 10))
+        
+        view["daily_spacer"] = tk.Label(daily_card, text="", bg=self.card_bg)
+        view["daily_spacer"].pack(pady=5)
+        
+        view["daily"] = []
+        for _ in range(DAILY_ROWS):
+            day_frame = tk.Frame(daily_card, bg='#f8f9fa')
             
+            row = {"frame": day_frame}
+            row["day"] = tk.Label(day_frame, font=('Segoe UI', 11), width=12,
+                                  bg='#f8f9fa', fg=self.text_dark, anchor=tk.W)
+            row["day"].pack(side=tk.LEFT, padx=(10, 0), pady=10)
+            row["icon"] = tk.Label(day_frame, bg='#f8f9fa')
+            row["icon"].pack(side=tk.LEFT, padx=10)
+            row["desc"] = tk.Label(day_frame, width=20, font=('Segoe UI', 9),
+                                   bg='#f8f9fa', fg=self.text_light, anchor=tk.W)
+            row["desc"].pack(side=tk.LEFT)
+            row["temps"] = tk.Label(day_frame, font=('Segoe UI', 11, 'bold'),
+                                    bg='#f8f9fa', fg=self.text_dark)
+            row["temps"].pack(side=tk.RIGHT, padx=15)
+            view["daily"].append(row)
+        
+
+        history_card = tk.Frame(self.weather_container, bg=self.card_bg)
+        history_card.pack(fill=tk.X, padx=20, pady=(0, 20))
+        
+        history_head = tk.Frame(history_card, bg=self.card_bg)
+        history_head.pack(fill=tk.X, padx=25, pady=(15, 10))
+        tk.Label(history_head, text="History",
+                font=('Segoe UI', 14, 'bold'),
+                bg=self.card_bg, fg=self.text_dark).pack(side=tk.LEFT)
+        for label in reversed(list(HISTORY_RANGES)):
+            tk.Radiobutton(history_head, text=label, value=label,
+                           variable=self.history_range, indicatoron=False,
+                           command=self._refresh_history,
+                           font=('Segoe UI', 9), relief='flat', bd=0,
+                           bg='#ecf0f1', fg=self.text_dark,
+                           selectcolor=self.accent, padx=10,
+                           cursor='hand2').pack(side=tk.RIGHT, padx=2)
+        
+        fig = Figure(figsize=(7.5, 2.2), dpi=100, facecolor=self.card_bg)
+        ax = fig.add_subplot(111)
+        line, = ax.plot([], [], color=self.accent, linewidth=1.5)
+        ax.grid(True, linestyle=':', alpha=0.3)
+        ax.set_facecolor('#f8f9fa')
+        ax.set_xlabel('Days ago', fontsize=9)
+        history_widget = FigureCanvasTkAgg(fig, master=history_card)
+        history_widget.get_tk_widget().pack(padx=25, pady=(0, 15))
+        view["history"] = {"fig": fig, "ax": ax, "line": line, "band": None,
+                           "canvas": history_widget, "layout": None}
+        
+        self._view = view
+        return view
+
+    def _refresh_history(self):
+        if self._history_cell:
+            threading.Thread(target=self._load_history,
+                             args=(self._history_cell, self.history_range.get()),
+                             daemon=True).start()
+
+    def _load_history(self, cell, range_label):
+        days, resolution = HISTORY_RANGES[range_label]
+        now = time.time()
+        try:
+            with span("history.query"):
+                rows = history_store().query(cell, "current", now - days * 86400,
+                                             now, resolution)
+        except Exception as e:
+            self.status_text.set(f"History error: {e}")
+            return
+        self.after(0, lambda: self._render_history(cell, rows, now))
+
+    def _render_history(self, cell, rows, now):
+        if not self._view or cell != self._history_cell:
+            return
+        with span("render.history"):
+            history = self._view["history"]
+            ax = history["ax"]
+            x = (rows["ts"] - now) / 86400.0
+            temp, tmin, tmax = rows["temp"], rows["temp_min"], rows["temp_max"]
+            if self.units.get() != "metric":
+                temp, tmin, tmax = (t * 9 / 5 + 32 for t in (temp, tmin, tmax))
+            unit_sym = "°C" if self.units.get() == "metric" else "°F"
+            history["line"].set_data(x, temp)
+            if history["band"] is not None:
+                history["band"].remove()
+            history["band"] = ax.fill_between(x, tmin, tmax, color=self.accent,
+                                              alpha=0.15, linewidth=0)
+            ax.set_ylabel(f'Temperature ({unit_sym})', fontsize=10)
+            ax.relim()
+            ax.autoscale_view()
+            self._relayout(history)
+            history["canvas"].draw_idle()
+
+    def _relayout(self, chart):
+        # tight_layout costs ~20 ms, so it only reruns when the text around
+        # the axes (labels or tick labels) differs from the last layout.
+        key = _layout_key(chart["ax"])
+        if key != chart["layout"]:
+            chart["fig"].tight_layout(pad=1.5)
+            chart["layout"] = key
+
+    def _set_icon(self, label, icon_code, size):
+        img = fetch_icon_image(icon_code, size=size) if icon_code else None
+        label.config(image=img or "")
+        label.image = img
+
+    def _render_weather(self, current, table, display_name):
+        try:
+            with span("render"):
+                self._render_sections(current, table, display_name)
+        except Exception as e:
+            self.status_text.set(f"Render error: {e}")
 
-            left_frame = tk.Frame(main_frame, bg=self.card_bg)
-            left_frame.pack(side=tk.LEFT)
+    def _render_sections(self, current, table, display_name):
+        if not self._view:
+            with span("render.build"):
+                self._build_weather_view()
+        view = self._view
+        
+        unit_sym = "°C" if self.units.get() == "metric" else "°F"
+        speed_unit = "m/s" if self.units.get() == "metric" else "mph"
+        
+        with span("render.current"):
+            view["name"].config(text=display_name or "Location")
+            view["date"].config(
+                text=datetime.now().strftime("%A, %B %d, %Y • %I:%M %p"))
             
             weather = current.get("weather", [{}])[0]
-            icon = weather.get("icon")
-            if icon:
-                img = fetch_icon_image(icon, size=(100, 100))
-                if img:
-                    icon_lbl = tk.Label(left_frame, image=img, bg=self.card_bg)
-                    icon_lbl.image = img
-                    icon_lbl.pack(side=tk.LEFT)
-            
-            temp_frame = tk.Frame(left_frame, bg=self.card_bg)
-            temp_frame.pack(side=tk.LEFT, padx=(10, 0))
+            self._set_icon(view["icon"], weather.get("icon"), (100, 100))
             
             temp = current["main"]["temp"]
-            tk.Label(temp_frame, text=f"{round(temp)}",
-                    font=('Segoe UI', 56, 'bold'),
-                    bg=self.card_bg, fg=self.text_dark).pack(anchor=tk.W)
-            
-            desc = weather.get("description", "").capitalize()
-            tk.Label(temp_frame, text=desc,
-                    font=('Segoe UI', 16),
-                    bg=self.card_bg, fg=self.text_light).pack(anchor=tk.W)
-            
-            # Right: Details
-            details_frame = tk.Frame(main_frame, bg=self.card_bg)
-            details_frame.pack(side=tk.RIGHT, padx=(30, 0))
+            view["temp"].config(text=f"{round(temp)}")
+            view["desc"].config(text=weather.get("description", "").capitalize())
             
             feels = current["main"]["feels_like"]
             humidity = current["main"]["humidity"]
             wind = current["wind"]["speed"]
             
-            self._add_detail(details_frame, "Feels like", f"{round(feels)}{unit_sym}")
-            self._add_detail(details_frame, "Humidity", f"{humidity}%")
-            self._add_detail(details_frame, "Wind", f"{wind} {speed_unit}")
-            
-            self.status_text.set("Weather updated successfully")
-            
-
-            hourly_card = tk.Frame(self.weather_container, bg=self.card_bg)
-            hourly_card.pack(fill=tk.X, padx=20, pady=(0, 15))
-            
-            tk.Label(hourly_card, text="Hourly Forecast",
-                    font=('Segoe UI', 14, 'bold'),
-                    bg=self.card_bg, fg=self.text_dark).pack(anchor=tk.W, 
-                                                              padx=25, pady=(15, 10))
-            
-
-            hourly_canvas = tk.Canvas(hourly_card, bg=self.card_bg, 
-                                     height=140, highlightthickness=0)
-            hourly_inner = tk.Frame(hourly_canvas, bg=self.card_bg)
-            
-            hourly_canvas.create_window((0, 0), window=hourly_inner, anchor="nw")
-            hourly_canvas.pack(fill=tk.X, padx=25, pady=(0, 15))
-            
-            forecasts = forecast.get("list", [])[:8]
-            for item in forecasts:
-                dt = datetime.fromtimestamp(item["dt"])
-                time_str = dt.strftime("%I %p")
-                temp_h = item["main"]["temp"]
-                icon_h = item["weather"][0].get("icon")
-                
-                hour_frame = tk.Frame(hourly_inner, bg='#f8f9fa', 
-                                     width=90, height=120)
-                hour_frame.pack(side=tk.LEFT, padx=5)
-                hour_frame.pack_propagate(False)
-                
-                tk.Label(hour_frame, text=time_str,
-                        font=('Segoe UI', 9),
-                        bg='#f8f9fa', fg=self.text_light).pack(pady=(8, 0))
-                
-                if icon_h:
-                    img_h = fetch_icon_image(icon_h, size=(50, 50))
-                    if img_h:
-                        lbl = tk.Label(hour_frame, image=img_h, bg='#f8f9fa')
-                        lbl.image = img_h
-                        lbl.pack()
-                
-                tk.Label(hour_frame, text=f"{round(temp_h)}{unit_sym}",
-                        font=('Segoe UI', 11, 'bold'),
-                        bg='#f8f9fa', fg=self.text_dark).pack()
-            
-            hourly_inner.update_idletasks()
-            hourly_canvas.config(scrollregion=hourly_canvas.bbox("all"))
-            
-            # Temperature chart
-            chart_card = tk.Frame(self.weather_container, bg=self.card_bg)
-            chart_card.pack(fill=tk.X, padx=20, pady=(0, 15))
-            
-            tk.Label(chart_card, text="Temperature Trend",
-                    font=('Segoe UI', 14, 'bold'),
-                    bg=self.card_bg, fg=self.text_dark).pack(anchor=tk.W,
-                                                              padx=25, pady=(15, 10))
-            
-            temps = [f["main"]["temp"] for f in forecasts]
-            times = [datetime.fromtimestamp(f["dt"]).strftime("%I%p") 
-                    for f in forecasts]
+            view["feels"].config(text=f"{round(feels)}{unit_sym}")
+            view["humidity"].config(text=f"{humidity}%")
+            view["wind"].config(text=f"{wind} {speed_unit}")
+        
+        self.status_text.set("Weather updated successfully")
+        
+        hourly = table.hourly(HOURLY_SLOTS)
+        temps = hourly.temp.tolist()
+        with span("render.hourly"):
+            for i, slot in enumerate(view["hourly"]):
+                if i >= len(hourly):
+                    slot["frame"].pack_forget()
+                    continue
+                slot["time"].config(text=_hour_label(hourly.local[i]))
+                self._set_icon(slot["icon"], str(hourly.icon[i]), (50, 50))
+                slot["temp"].config(text=f"{round(temps[i])}{unit_sym}")
+                slot["frame"].pack(side=tk.LEFT, padx=5)
             
-            fig = Figure(figsize=(7.5, 2.5), dpi=100, facecolor=self.card_bg)
-            ax = fig.add_subplot(111)
-            ax.plot(range(len(temps)), temps, marker='o', 
-                   color=self.accent, linewidth=2, markersize=6)
+            view["hourly_inner"].update_idletasks()
+            view["hourly_canvas"].config(
+                scrollregion=view["hourly_canvas"].bbox("all"))
+        
+        times = hourly.hour_labels(sep="")
+        
+        # The draw itself happens later on idle; it is timed as chart.draw.
+        with span("render.chart"):
+            chart = view["chart"]
+            ax = chart["ax"]
+            chart["line"].set_data(range(len(temps)), temps)
             ax.set_xticks(range(len(times)))
             ax.set_xticklabels(times, fontsize=9)
             ax.set_ylabel(f'Temperature ({unit_sym})', fontsize=10)
-            ax.grid(True, linestyle=':', alpha=0.3)
-            ax.set_facecolor('#f8f9fa')
-            fig.tight_layout(pad=1.5)
-            
-            chart_widget = FigureCanvasTkAgg(fig, master=chart_card)
-            chart_widget.get_tk_widget().pack(padx=25, pady=(0, 15))
-            chart_widget.draw()
-            
-
-            daily_card = tk.Frame(self.weather_container, bg=self.card_bg)
-            daily_card.pack(fill=tk.X, padx=20, pady=(0, 20))
-            
-            tk.Label(daily_card, text="7-Day Forecast",
-                    font=('Segoe UI', 14, 'bold'),
-                    bg=self.card_bg, fg=self.text_dark).pack(anchor=tk.W,
-                                                              padx=25, pady=(15, 10))
-            
+            ax.relim()
+            ax.autoscale_view()
+            self._relayout(chart)
+            chart["canvas"].draw_idle()
+        
 
-            daily_data = {}
-            for item in forecast.get("list", []):
-                date = datetime.fromtimestamp(item["dt"]).date()
-                if date not in daily_data:
-                    daily_data[date] = []
-                daily_data[date].append(item)
-            
-            for date, items in list(daily_data.items())[:7]:
-                temps_day = [i["main"]["temp"] for i in items]
-                tmax = max(temps_day)
-                tmin = min(temps_day)
-                icon_d = items[0]["weather"][0].get("icon")
-                desc_d = items[0]["weather"][0].get("description", "").capitalize()
-                
-                day_frame = tk.Frame(daily_card, bg='#f8f9fa')
-                day_frame.pack(fill=tk.X, padx=25, pady=5)
-                
-                tk.Label(day_frame, text=date.strftime("%A"),
-                        font=('Segoe UI', 11), width=12,
-                        bg='#f8f9fa', fg=self.text_dark, anchor=tk.W).pack(
-                        side=tk.LEFT, padx=(10, 0), pady=10)
-                
-                if icon_d:
-                    img_d = fetch_icon_image(icon_d, size=(40, 40))
-                    if img_d:
-                        lbl = tk.Label(day_frame, image=img_d, bg='#f8f9fa')
-                        lbl.image = img_d
-                        lbl.pack(side=tk.LEFT, padx=10)
-                
-                tk.Label(day_frame, text=desc_d, width=20,
-                        font=('Segoe UI', 9),
-                        bg='#f8f9fa', fg=self.text_light, anchor=tk.W).pack(
-                        side=tk.LEFT)
+        with span("render.daily"):
+            days = table.daily(DAILY_ROWS)
+            for i, row in enumerate(view["daily"]):
+                if i >= len(days):
+                    row["frame"].pack_forget()
+                    continue
+                day = days[i]
+                tmax, tmin = day["tmax"], day["tmin"]
                 
-                tk.Label(day_frame, 
-                        text=f"{round(tmax)}{unit_sym} / {round(tmin)}{unit_sym}",
-                        font=('Segoe UI', 11, 'bold'),
-                        bg='#f8f9fa', fg=self.text_dark).pack(side=tk.RIGHT,
-                                                               padx=15)
-            
-            tk.Label(daily_card, text="", bg=self.card_bg).pack(pady=5)
-            
-        except Exception as e:
-            self.status_text.set(f"Render error: {e}")
+                row["day"].config(text=day["date"].strftime("%A"))
+                self._set_icon(row["icon"], day["icon"], (40, 40))
+                row["desc"].config(text=day["desc"].capitalize())
+                row["temps"].config(
+                    text=f"{round(tmax)}{unit_sym} / {round(tmin)}{unit_sym}")
+                row["frame"].pack(fill=tk.X, padx=25, pady=5,
+                                  before=view["daily_spacer"])
+        
+        self._refresh_history()
+
+    def _toggle_debug_overlay(self, event=None):
+        if self._overlay.winfo_ismapped():
+            self._overlay.place_forget()
+            return
+        self._overlay.place(relx=0, rely=1, x=8, y=-8, anchor=tk.SW)
+        self._overlay.lift()
+        self._refresh_debug_overlay()
+
+    def _refresh_debug_overlay(self):
+        if not self._overlay.winfo_ismapped():
+            return
+        lines = [f"{'stage':16}{'p50 ms':>9}{'p95 ms':>9}{'n':>6}{'err':>5}"]
+        for stage, s in telemetry.snapshot().items():
+            lines.append(f"{stage:16}{s['p50'] * 1000:9.1f}{s['p95'] * 1000:9.1f}"
+                         f"{s['count']:6d}{s['errors']:5d}")
+        self._overlay.config(text="\n".join(lines))
+        self.after(1000, self._refresh_debug_overlay)
+
+    def _export_metrics(self):
+        try:
+            telemetry.write_metrics(METRICS_FILE)
+        except OSError:
+            pass
+        self.after(METRICS_INTERVAL_MS, self._export_metrics)
 
     def _add_detail(self, parent, label, value):
         frame = tk.Frame(parent, bg=self.card_bg)
         frame.pack(anchor=tk.E, pady=3)
         tk.Label(frame, text=f"{label}:", font=('Segoe UI', 10),
                 bg=self.card_bg, fg=self.text_light).pack(side=tk.LEFT)
-        tk.Label(frame, text=value, font=('Segoe UI', 10, 'bold'),
-                bg=self.card_bg, fg=self.text_dark).pack(side=tk.LEFT, padx=(5, 0))
+        value_lbl = tk.Label(frame, text=value, font=('Segoe UI', 10, 'bold'),
+                             bg=self.card_bg, fg=self.text_dark)
+        value_lbl.pack(side=tk.LEFT, padx=(5, 0))
+        return value_lbl
 
 def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Weather App")
+    parser.add_argument("--watch", metavar="FILE",
+                        help='JSON list of {"name", "lat", "lon"} to keep updated')
+    parser.add_argument("--metrics-port", type=int,
+                        help="serve Prometheus metrics on localhost:PORT/metrics")
+    parser.add_argument("--debug-overlay", action="store_true",
+                        help="start with the latency overlay shown (toggle: F12)")
+    args = parser.parse_args()
+    if tk is None:
+        print("⚠️ Tkinter is not available; use weather_service.py for a "
+              "headless lookup or the JSON service")
+        return
     if API_KEY == "YOUR_OPENWEATHERMAP_API_KEY":
         print("⚠️ Please set API_KEY to your OpenWeatherMap API key")
         print("Get one free at: https://openweathermap.org/api")
         return
+    if args.metrics_port:
+        telemetry.serve_metrics(args.metrics_port)
     app = WeatherApp()
-    app.mainloop()
+    if args.watch:
+        with open(args.watch) as f:
+            app.watch_locations(json.load(f))
+    if args.debug_overlay:
+        app.after_idle(app._toggle_debug_overlay)
+    try:
+        app.mainloop()
+    finally:
+        try:
+            telemetry.write_metrics(METRICS_FILE)
+        except OSError:
+            pass
 
 if __name__ == "__main__":
 
@@ -0,0 +1,117 @@
+"""Benchmark multi-location fetching against the local mock server.
+
+Compares one-at-a-time fetching (the single-location path) with
+fetch_many() for the same set of locations, then fetches clustered
+sites (a few hundred metres apart) to show geohash cache reuse. With
+--quota it also runs a batch slightly over one minute's quota against a
+mock server that answers 429 above it (takes about a minute).
+
+    python bench_batch.py --locations 120 --latency 0.05
+    python bench_batch.py --quota 60
+"""
+
+import argparse
+import random
+import tempfile
+import time
+
+from mock_owm import MockOWMServer
+from weather_service import load_app
+
+
+def make_locations(n, seed=0):
+    rng = random.Random(seed)
+    return [{"name": f"site-{i}", "lat": round(rng.uniform(-60, 70), 4),
+             "lon": round(rng.uniform(-180, 180), 4)} for i in range(n)]
+
+
+def make_clustered_locations(n, clusters, seed=0):
+    rng = random.Random(seed)
+    centres = make_locations(clusters, seed + 1)
+    return [{"name": f"cluster-site-{i}",
+             "lat": round(c["lat"] + rng.uniform(-0.003, 0.003), 5),
+             "lon": round(c["lon"] + rng.uniform(-0.003, 0.003), 5)}
+            for i, c in ((i, centres[i % clusters]) for i in range(n))]
+
+
+def reset_cache(app):
+    app._cache.clear()
+    for stat in app._stats:
+        app._stats[stat] = 0
+
+
+def run_sequential(app, locations, units):
+    for loc in locations:
+        app.fetch_current_weather(loc["lat"], loc["lon"], units)
+        app.fetch_forecast(loc["lat"], loc["lon"], units)
+
+
+def timed(label, server, fn):
+    server.reset_counters()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:34} {elapsed:8.2f} s  {server.requests:5d} requests")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--locations", type=int, default=120)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--quota", type=int,
+                        help="also run a batch held to this many calls/min")
+    args = parser.parse_args()
+
+    app = load_app()
+    app.HISTORY_DIR = tempfile.mkdtemp(prefix="weatherapp-history-")
+    server = MockOWMServer(latency=args.latency).start()
+    server.patch_app(app)
+    app.api_quota = app.RateLimiter(10 ** 9)
+    locations = make_locations(args.locations)
+    # Put the "visible" location last in the list to show it is still
+    # served first.
+    locations[-1]["priority"] = 0
+    order = []
+
+    try:
+        print(f"{args.locations} locations, {args.latency * 1000:.0f} ms "
+              f"server latency\n")
+        timed("sequential", server,
+              lambda: run_sequential(app, locations, "metric"))
+        reset_cache(app)
+        timed(f"fetch_many (concurrency {args.concurrency})", server,
+              lambda: app.fetch_many(locations, "metric", args.concurrency,
+                                     on_result=lambda r: order.append(r["name"])))
+        print(f"  first completed: {order[0]} (priority 0)")
+        timed("fetch_many again (warm cache)", server,
+              lambda: app.fetch_many(locations, "metric", args.concurrency))
+        reset_cache(app)
+        clustered = make_clustered_locations(args.locations,
+                                             max(1, args.locations // 6))
+        timed("clustered sites (1 concurrent)", server,
+              lambda: app.fetch_many(clustered, "metric", 1))
+        report = app.cache_report()
+        print(f"  hit rate {report['hit_rate']:.0%}: "
+              f"{report['hits']} same-cell, {report['nearby_hits']} nearby, "
+              f"{report['api_calls']} API calls, "
+              f"{report['api_calls_saved']} saved")
+        if args.quota:
+            reset_cache(app)
+            app.api_quota = app.RateLimiter(args.quota)
+            server.rate_limit = args.quota
+            subset = make_locations(args.quota // 2 + 5, seed=1)
+            results = timed(f"fetch_many {len(subset)} @ {args.quota}/min quota",
+                            server,
+                            lambda: app.fetch_many(subset, "metric",
+                                                   args.concurrency))
+            failed = sum(1 for r in results if r["error"])
+            print(f"  {len(results) - failed} ok, {failed} failed, "
+                  f"{server.throttled} throttled by the server")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""End-to-end performance suite for the weather app against mock_owm.
+
+Drives the app's own search / my-location handlers and measures
+time-to-render, requests per endpoint, cache hit rate and memory over a
+long run; --json also records the per-stage telemetry. With a display
+(or under xvfb-run) the real Tk window renders; without one the render
+layer is stubbed and everything up to it (fetch, parse, icon
+download/decode) still runs.
+
+    python bench_e2e.py --iterations 500 --latency 0.03
+    xvfb-run python bench_e2e.py --display
+    python bench_e2e.py --error-rate 0.05 --rate-limit 300 --json out.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import resource
+import statistics
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import telemetry
+from mock_owm import MockOWMServer
+from weather_service import load_app
+
+
+CITIES = ["Springfield", "Riverside", "Franklin", "Greenville", "Bristol",
+          "Clinton", "Fairview", "Salem", "Madison", "Georgetown"]
+
+
+class _Var:
+    def __init__(self, value=""):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+
+def headless_window(app):
+    # Borrows WeatherApp's fetch/parse handlers onto a plain object; after()
+    # runs callbacks inline and _render_weather only records the call.
+    W = app.WeatherApp
+
+    class HeadlessWindow:
+        _do_geocode_and_fetch = W._do_geocode_and_fetch
+        _do_ip_and_fetch = W._do_ip_and_fetch
+        _fetch_for_city = W._fetch_for_city
+        _update_weather_for = W._update_weather_for
+        _follow_location = W._follow_location
+        _on_refreshed = W._on_refreshed
+        _show_weather = W._show_weather
+
+        def __init__(self):
+            self.units = _Var("metric")
+            self.status_text = _Var()
+            self.city_index = None
+            self._followed = None
+            self._followed_name = None
+            self.rendered = threading.Event()
+
+        def after(self, ms, callback):
+            callback()
+
+        def _render_weather(self, current, table, display_name):
+            self.rendered.set()
+
+        def run(self, handler, *args, timeout=30):
+            self.rendered.clear()
+            start = time.perf_counter()
+            handler(self, *args)
+            return time.perf_counter() - start if self.rendered.is_set() else None
+
+        def close(self):
+            pass
+
+    return HeadlessWindow()
+
+
+def tk_window(app):
+    win = app.WeatherApp()
+    win.city_index = None
+    rendered = threading.Event()
+    render = win._render_weather
+
+    def timed_render(*args):
+        render(*args)
+        win.update_idletasks()
+        rendered.set()
+
+    win._render_weather = timed_render
+
+    def run(handler, *args, timeout=30):
+        rendered.clear()
+        start = time.perf_counter()
+        worker = threading.Thread(target=handler, args=(win, *args), daemon=True)
+        worker.start()
+        while not rendered.is_set() and (worker.is_alive() or
+                                         time.perf_counter() - start < 1):
+            win.update()
+            if time.perf_counter() - start > timeout:
+                break
+            time.sleep(0.001)
+        return time.perf_counter() - start if rendered.is_set() else None
+
+    win.run = run
+    win.close = win.destroy
+    return win
+
+
+def memory_sample(app):
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    return {"traced_kib": current // 1024, "traced_peak_kib": peak // 1024,
+            "maxrss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            "cache_entries": len(app._cache)}
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))] if values else None
+
+
+def summarise(label, times, server, app, failures=0):
+    ok = [t for t in times if t is not None]
+    report = app.cache_report()
+    row = {"scenario": label, "runs": len(times), "failed": failures,
+           "p50_ms": percentile(ok, 0.5) and percentile(ok, 0.5) * 1000,
+           "p95_ms": percentile(ok, 0.95) and percentile(ok, 0.95) * 1000,
+           "mean_ms": statistics.fmean(ok) * 1000 if ok else None,
+           "requests": server.requests, "by_endpoint": dict(server.by_endpoint),
+           "server_errors": server.errors, "throttled": server.throttled,
+           "hit_rate": report["hit_rate"],
+           "api_calls_saved": report["api_calls_saved"]}
+    fmt = lambda v: f"{v:8.1f}" if v is not None else "       -"
+    print(f"{label:24} {fmt(row['p50_ms'])} {fmt(row['p95_ms'])} "
+          f"{row['requests']:7d} {row['hit_rate']:6.0%} {failures:6d}")
+    return row
+
+
+def reset_counters(app, server):
+    for stat in app._stats:
+        app._stats[stat] = 0
+    server.reset_counters()
+
+
+def reset(app, server):
+    app._cache.clear()
+    reset_counters(app, server)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=300)
+    parser.add_argument("--places", type=int, default=40,
+                        help="distinct searches cycled through in the long run")
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, default=None)
+    parser.add_argument("--payloads", help="recorded payload directory")
+    parser.add_argument("--display", action="store_true",
+                        help="render in a real Tk window")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    app = load_app()
+    tmp = tempfile.mkdtemp(prefix="weatherapp-bench-")
+    app.APP_CACHE_DIR = tmp
+    app.ICON_CACHE_DIR = os.path.join(tmp, "icons")
+    app.LAST_LOCATION_FILE = os.path.join(tmp, "last_location.json")
+    app.HISTORY_DIR = os.path.join(tmp, "history")
+    server = MockOWMServer(latency=args.latency, error_rate=args.error_rate,
+                           rate_limit=args.rate_limit, payloads=args.payloads,
+                           seed=0).start()
+    server.patch_app(app)
+    # The mock server enforces --rate-limit itself.
+    app.api_quota = app.RateLimiter(10 ** 9)
+    win = tk_window(app) if args.display else headless_window(app)
+    W = app.WeatherApp
+    rows, memory = [], []
+    start = time.perf_counter()
+    app.warm_up_imports()
+    warm_up_ms = (time.perf_counter() - start) * 1000
+    tracemalloc.start()
+
+    print(f"render: {'Tk' if args.display else 'stubbed'}, latency "
+          f"{args.latency * 1000:.0f} ms, error rate {args.error_rate:.0%}, "
+          f"rate limit {args.rate_limit or '-'}/min, import warm-up "
+          f"{warm_up_ms:.0f} ms\n")
+    print(f"{'scenario':24} {'p50 ms':>8} {'p95 ms':>8} {'reqs':>7} "
+          f"{'hits':>6} {'failed':>6}")
+    try:
+        reset(app, server)
+        t = win.run(W._do_geocode_and_fetch, CITIES[0])
+        rows.append(summarise("cold search", [t], server, app, t is None))
+
+        reset_counters(app, server)
+        t = win.run(W._do_geocode_and_fetch, CITIES[0])
+        rows.append(summarise("repeat search", [t], server, app, t is None))
+
+        reset_counters(app, server)
+        t = win.run(W._do_ip_and_fetch)
+        rows.append(summarise("my location", [t], server, app, t is None))
+
+        reset(app, server)
+        rng = random.Random(0)
+        places = [f"{rng.choice(CITIES)} {i}" for i in range(args.places)]
+        times = []
+        memory.append(dict(iteration=0, **memory_sample(app)))
+        step = max(1, args.iterations // 5)
+        for i in range(1, args.iterations + 1):
+            times.append(win.run(W._do_geocode_and_fetch, rng.choice(places)))
+            if i % step == 0:
+                memory.append(dict(iteration=i, **memory_sample(app)))
+        failures = sum(1 for t in times if t is None)
+        rows.append(summarise(f"long run x{args.iterations}", times, server,
+                              app, failures))
+    finally:
+        win.close()
+        server.stop()
+
+    print("\nmemory over the long run:")
+    print(f"{'iteration':>9} {'traced KiB':>11} {'peak KiB':>9} "
+          f"{'maxrss KiB':>11} {'cache':>6}")
+    for m in memory:
+        print(f"{m['iteration']:9d} {m['traced_kib']:11d} "
+              f"{m['traced_peak_kib']:9d} {m['maxrss_kib']:11d} "
+              f"{m['cache_entries']:6d}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "scenarios": rows,
+                       "warm_up_ms": warm_up_ms, "memory": memory,
+                       "stages": telemetry.snapshot()}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
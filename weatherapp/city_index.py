@@ -0,0 +1,238 @@
+"""Offline city gazetteer for the weather app.
+
+Compiles a GeoNames cities dump (e.g. cities15000.txt) into a compact
+binary index that is memory-mapped at runtime. Keys are normalised city
+names kept in sorted order, so a prefix lookup is a binary search plus a
+population-ranked pick over the matching range.
+
+Build it once:
+    python city_index.py --download            # fetch cities15000 from GeoNames
+    python city_index.py cities15000.txt       # or from a local dump
+"""
+
+import bisect
+import heapq
+import io
+import mmap
+import os
+import struct
+import sys
+import unicodedata
+from array import array
+
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.expanduser("~"), ".cache",
+                                  "oibsip-weatherapp", "cities.idx")
+GEONAMES_URL = "https://download.geonames.org/export/dump/{name}.zip"
+
+MAGIC = b"OWCIDX01"
+HEADER = struct.Struct("<8sII")   # magic, record count, label count
+
+
+def normalize(text):
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(text.casefold().split())
+
+
+def _read_geonames(lines, min_population):
+    # cities*.txt columns: 1 name, 2 asciiname, 4 lat, 5 lon,
+    # 8 country code, 14 population
+    for line in lines:
+        cols = line.rstrip("\n").split("\t")
+        if len(cols) < 15:
+            continue
+        population = int(cols[14] or 0)
+        if population < min_population:
+            continue
+        yield (cols[1], cols[2], float(cols[4]), float(cols[5]),
+               cols[8], population)
+
+
+def build_index(lines, out_path, min_population=0):
+    labels = []
+    entries = []
+    for name, ascii_name, lat, lon, country, population in \
+            _read_geonames(lines, min_population):
+        label_id = len(labels)
+        labels.append((f"{name}, {country}", lat, lon, population))
+        for key in {normalize(name), normalize(ascii_name)}:
+            if key:
+                entries.append((key, label_id))
+    entries.sort()
+
+    key_blob = bytearray()
+    key_offsets = array("I", [0])
+    key_labels = array("I")
+    for key, label_id in entries:
+        key_blob += key.encode("utf-8")
+        key_offsets.append(len(key_blob))
+        key_labels.append(label_id)
+
+    label_blob = bytearray()
+    label_offsets = array("I", [0])
+    lats, lons, pops = array("f"), array("f"), array("I")
+    for label, lat, lon, population in labels:
+        label_blob += label.encode("utf-8")
+        label_offsets.append(len(label_blob))
+        lats.append(lat)
+        lons.append(lon)
+        pops.append(min(population, 0xFFFFFFFF))
+
+    if sys.byteorder != "little":
+        for arr in (key_offsets, key_labels, label_offsets, lats, lons, pops):
+            arr.byteswap()
+
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    tmp = out_path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(entries), len(labels)))
+        for arr in (key_offsets, key_labels, label_offsets, lats, lons, pops):
+            f.write(arr.tobytes())
+        f.write(key_blob)
+        f.write(b"\0" * (-len(key_blob) % 4))
+        f.write(label_blob)
+    os.replace(tmp, out_path)
+    return len(labels), len(entries)
+
+
+def download_and_build(out_path, dump="cities15000", min_population=0):
+    import urllib.request
+    import zipfile
+    with urllib.request.urlopen(GEONAMES_URL.format(name=dump)) as r:
+        payload = r.read()
+    with zipfile.ZipFile(io.BytesIO(payload)) as zf:
+        with zf.open(f"{dump}.txt") as raw:
+            lines = io.TextIOWrapper(raw, encoding="utf-8")
+            return build_index(lines, out_path, min_population)
+
+
+class _Keys:
+    # Sequence view over the sorted key column so bisect can search it.
+    def __init__(self, index):
+        self._index = index
+
+    def __len__(self):
+        return self._index.count
+
+    def __getitem__(self, i):
+        return self._index._key(i)
+
+
+class CityIndex:
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self.label_count = HEADER.unpack_from(self._mm)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a city index")
+        self._view = view = memoryview(self._mm)
+        pos = HEADER.size
+
+        def column(fmt, n):
+            nonlocal pos
+            col = view[pos:pos + 4 * n].cast(fmt)
+            pos += 4 * n
+            return col
+
+        self._key_offsets = column("I", self.count + 1)
+        self._key_labels = column("I", self.count)
+        self._label_offsets = column("I", self.label_count + 1)
+        self._lats = column("f", self.label_count)
+        self._lons = column("f", self.label_count)
+        self._pops = column("I", self.label_count)
+        self._key_base = pos
+        key_len = self._key_offsets[self.count]
+        self._label_base = pos + key_len + (-key_len % 4)
+        self._keys = _Keys(self)
+
+    def close(self):
+        for attr in ("_key_offsets", "_key_labels", "_label_offsets",
+                     "_lats", "_lons", "_pops", "_view"):
+            col = self.__dict__.pop(attr, None)
+            if col is not None:
+                col.release()
+        self._mm.close()
+        self._file.close()
+
+    def _key(self, i):
+        start = self._key_base + self._key_offsets[i]
+        end = self._key_base + self._key_offsets[i + 1]
+        return self._mm[start:end].decode("utf-8")
+
+    def _city(self, label_id):
+        start = self._label_base + self._label_offsets[label_id]
+        end = self._label_base + self._label_offsets[label_id + 1]
+        label = self._mm[start:end].decode("utf-8")
+        name, _, country = label.rpartition(", ")
+        return {"name": name, "country": country, "label": label,
+                "lat": round(self._lats[label_id], 4),
+                "lon": round(self._lons[label_id], 4),
+                "population": self._pops[label_id]}
+
+    def _range(self, key):
+        lo = bisect.bisect_left(self._keys, key)
+        hi = bisect.bisect_left(self._keys, key + "\U0010ffff", lo)
+        return lo, hi
+
+    def complete(self, prefix, limit=8):
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        lo, hi = self._range(prefix)
+        label_ids = {self._key_labels[i] for i in range(lo, hi)}
+        best = heapq.nlargest(limit, label_ids, key=self._pops.__getitem__)
+        return [self._city(label_id) for label_id in best]
+
+    def resolve(self, query):
+        name, _, country = query.partition(",")
+        key = normalize(name)
+        country = country.strip().upper()
+        if not key:
+            return None
+        lo = bisect.bisect_left(self._keys, key)
+        hi = bisect.bisect_right(self._keys, key, lo)
+        label_ids = [self._key_labels[i] for i in range(lo, hi)]
+        cities = [self._city(label_id) for label_id in label_ids]
+        if country:
+            cities = [c for c in cities if c["country"] == country]
+        if not cities:
+            return None
+        return max(cities, key=lambda c: c["population"])
+
+
+def open_city_index(path=DEFAULT_INDEX_PATH):
+    try:
+        return CityIndex(path)
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Build the offline city index")
+    parser.add_argument("source", nargs="?",
+                        help="GeoNames cities*.txt dump to compile")
+    parser.add_argument("--download", metavar="DUMP", nargs="?",
+                        const="cities15000",
+                        help="fetch a GeoNames dump instead (default cities15000)")
+    parser.add_argument("-o", "--output", default=DEFAULT_INDEX_PATH)
+    parser.add_argument("--min-population", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.download:
+        cities, keys = download_and_build(args.output, args.download,
+                                          args.min_population)
+    elif args.source:
+        with open(args.source, encoding="utf-8") as f:
+            cities, keys = build_index(f, args.output, args.min_population)
+    else:
+        parser.error("give a GeoNames dump or --download")
+    size = os.path.getsize(args.output)
+    print(f"Indexed {cities} cities ({keys} keys, {size / 1024:.0f} KiB) "
+          f"-> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
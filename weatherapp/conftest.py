@@ -0,0 +1,24 @@
+import pytest
+
+from mock_owm import MockOWMServer
+from weather_service import load_app
+
+
+@pytest.fixture(scope="module")
+def server():
+    server = MockOWMServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def app(server, tmp_path):
+    app = load_app()
+    server.patch_app(app)
+    app.APP_CACHE_DIR = str(tmp_path)
+    app.ICON_CACHE_DIR = str(tmp_path / "icons")
+    app.LAST_LOCATION_FILE = str(tmp_path / "last_location.json")
+    app.HISTORY_DIR = str(tmp_path / "history")
+    app.api_quota = app.RateLimiter(10 ** 9)
+    server.reset_counters()
+    return app
@@ -0,0 +1,314 @@
+"""Append-only columnar history of weather observations.
+
+Layout: <root>/<location>/<series>/<tier>/<partition>/<column>.bin, one
+flat little-endian array per column. Appending a batch appends to every
+column file; a reader trusts the shortest column, so a torn append never
+yields misaligned rows.
+
+Tiers, from finest to coarsest:
+    raw     every observation      one partition per UTC day
+    hourly  per-hour aggregates    one partition per month
+    daily   per-day aggregates     one partition per year
+Aggregates keep mean/min/max per value column plus a sample count.
+compact() folds raw days older than raw_days into hourly and hourly
+months older than hourly_days into daily; enforce_budget() compacts
+early (and finally drops the oldest daily partitions) to stay under the
+disk budget, which counts allocated blocks (what du reports), not file
+lengths: the many small column files each occupy at least one block.
+
+Series: "current" (one row per observation) and "forecast" (one row per
+forecast step, keyed by target time; aggregating averages the issues
+that covered the same hour). Values are stored in metric units.
+
+    python history_store.py --simulate --locations 20 --years 2
+"""
+
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+
+SERIES = {
+    "current": ("temp", "feels_like", "humidity", "wind"),
+    "forecast": ("temp", "humidity", "wind"),
+}
+TIERS = ("raw", "hourly", "daily")
+BUCKET_SECONDS = {"hourly": 3600, "daily": 86400}
+PARTITION_FORMAT = {"raw": "%Y-%m-%d", "hourly": "%Y-%m", "daily": "%Y"}
+
+
+def _columns(series, tier):
+    values = SERIES[series]
+    if tier == "raw":
+        return {"ts": "<i8", **{v: "<f4" for v in values}}
+    cols = {"ts": "<i8", "count": "<i4"}
+    for v in values:
+        cols.update({v: "<f4", f"{v}_min": "<f4", f"{v}_max": "<f4"})
+    return cols
+
+
+def _partition(tier, ts):
+    return time.strftime(PARTITION_FORMAT[tier], time.gmtime(int(ts)))
+
+
+def _partition_span(tier, name):
+    # [start, end) of a partition in epoch seconds (UTC).
+    parts = [int(p) for p in name.split("-")]
+    year, month, day = (parts + [1, 1])[:3]
+    start = _utc(year, month, day)
+    if tier == "raw":
+        return start, start + 86400
+    if tier == "hourly":
+        return start, _utc(year + month // 12, month % 12 + 1, 1)
+    return start, _utc(year + 1, 1, 1)
+
+
+def _utc(year, month, day):
+    import calendar
+    return calendar.timegm((year, month, day, 0, 0, 0))
+
+
+def _allocated(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return 0
+    blocks = getattr(st, "st_blocks", None)
+    if blocks is None:   # Windows: round up to the usual cluster size
+        return -(-st.st_size // 4096) * 4096
+    return blocks * 512
+
+
+def _size(path):
+    # Allocated bytes of a directory tree, directories included.
+    total = 0
+    for dirpath, _, files in os.walk(path):
+        total += _allocated(dirpath)
+        total += sum(_allocated(os.path.join(dirpath, f)) for f in files)
+    return total
+
+
+def aggregate(rows, series, bucket):
+    # rows: raw or aggregated columns -> aggregated columns per bucket.
+    values = SERIES[series]
+    if "count" not in rows:
+        rows = dict(rows, count=np.ones(len(rows["ts"]), dtype="<i4"),
+                    **{f"{v}_{s}": rows[v] for v in values for s in ("min", "max")})
+    if not len(rows["ts"]):
+        return {c: np.empty(0, d) for c, d in _columns(series, "hourly").items()}
+    keys = rows["ts"] // bucket * bucket
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(keys)) + 1))
+    count = rows["count"][order].astype(np.float64)
+    total = np.add.reduceat(count, starts)
+    out = {"ts": keys[starts].astype("<i8"), "count": total.astype("<i4")}
+    for v in values:
+        weighted = np.add.reduceat(rows[v][order] * count, starts)
+        out[v] = (weighted / total).astype("<f4")
+        out[f"{v}_min"] = np.minimum.reduceat(rows[f"{v}_min"][order], starts)
+        out[f"{v}_max"] = np.maximum.reduceat(rows[f"{v}_max"][order], starts)
+    return out
+
+
+class HistoryStore:
+    def __init__(self, root, budget_bytes=256 * 2 ** 20, raw_days=14,
+                 hourly_days=180):
+        self.root = root
+        self.budget_bytes = budget_bytes
+        self.raw_days = raw_days
+        self.hourly_days = hourly_days
+        self._lock = threading.RLock()
+
+    def _dir(self, location, series, tier, partition=None):
+        path = os.path.join(self.root, location, series, tier)
+        return os.path.join(path, partition) if partition else path
+
+    def _write(self, path, series, tier, rows):
+        os.makedirs(path, exist_ok=True)
+        for col, dtype in _columns(series, tier).items():
+            with open(os.path.join(path, f"{col}.bin"), "ab") as f:
+                f.write(np.asarray(rows[col], dtype=dtype).tobytes())
+
+    def _read(self, path, series, tier):
+        cols = {}
+        for col, dtype in _columns(series, tier).items():
+            try:
+                cols[col] = np.fromfile(os.path.join(path, f"{col}.bin"), dtype=dtype)
+            except (OSError, ValueError):
+                cols[col] = np.empty(0, dtype)
+        n = min(len(a) for a in cols.values())
+        return {c: a[:n] for c, a in cols.items()}
+
+    def partitions(self, location, series, tier):
+        try:
+            return sorted(os.listdir(self._dir(location, series, tier)))
+        except OSError:
+            return []
+
+    def locations(self):
+        try:
+            return sorted(os.listdir(self.root))
+        except OSError:
+            return []
+
+    def append(self, location, series, ts, **values):
+        ts = np.atleast_1d(np.asarray(ts, dtype="<i8"))
+        if not len(ts):
+            return
+        rows = {"ts": ts, **{v: np.atleast_1d(values[v]) for v in SERIES[series]}}
+        days = ts // 86400
+        with self._lock:
+            for day in np.unique(days):
+                mask = days == day
+                part = _partition("raw", day * 86400)
+                self._write(self._dir(location, series, "raw", part), series,
+                            "raw", {c: a[mask] for c, a in rows.items()})
+
+    def query(self, location, series, start, end, resolution="hourly"):
+        # Rows with start <= ts < end at `resolution`. Finer tiers that are
+        # not compacted yet are aggregated on the fly, so the range is
+        # complete whichever tier currently holds each part of it.
+        level = TIERS.index(resolution)
+        chunks = []
+        with self._lock:
+            for tier in TIERS[:level + 1][::-1]:
+                for name in self.partitions(location, series, tier):
+                    p_start, p_end = _partition_span(tier, name)
+                    if p_end <= start or p_start >= end:
+                        continue
+                    rows = self._read(self._dir(location, series, tier, name),
+                                      series, tier)
+                    mask = (rows["ts"] >= start) & (rows["ts"] < end)
+                    chunks.append({c: a[mask] for c, a in rows.items()})
+        if resolution == "raw":
+            cols = _columns(series, "raw")
+        else:
+            chunks = [aggregate(c, series, BUCKET_SECONDS[resolution])
+                      for c in chunks]
+            cols = _columns(series, resolution)
+        if not chunks:
+            return {c: np.empty(0, d) for c, d in cols.items()}
+        merged = {c: np.concatenate([ch[c] for ch in chunks]) for c in cols}
+        if resolution != "raw":
+            merged = aggregate(merged, series, BUCKET_SECONDS[resolution])
+        order = np.argsort(merged["ts"], kind="stable")
+        return {c: a[order] for c, a in merged.items()}
+
+    def _fold(self, location, series, tier, name):
+        # Move one partition into the next tier and delete it; returns the
+        # change in allocated bytes.
+        target = TIERS[TIERS.index(tier) + 1]
+        path = self._dir(location, series, tier, name)
+        target_dir = self._dir(location, series, target)
+        delta = -_size(path) - _size(target_dir)
+        rows = aggregate(self._read(path, series, tier), series,
+                         BUCKET_SECONDS[target])
+        parts = np.array([_partition(target, t) for t in rows["ts"]])
+        for part in np.unique(parts):
+            mask = parts == part
+            self._write(self._dir(location, series, target, part), series,
+                        target, {c: a[mask] for c, a in rows.items()})
+        shutil.rmtree(path, ignore_errors=True)
+        return delta + _size(target_dir)
+
+    def compact(self, now=None):
+        now = time.time() if now is None else now
+        cutoffs = {"raw": now - self.raw_days * 86400,
+                   "hourly": now - self.hourly_days * 86400}
+        folded = 0
+        with self._lock:
+            for location in self.locations():
+                for series in SERIES:
+                    for tier in ("raw", "hourly"):
+                        for name in self.partitions(location, series, tier):
+                            if _partition_span(tier, name)[1] <= cutoffs[tier]:
+                                self._fold(location, series, tier, name)
+                                folded += 1
+        return folded
+
+    def disk_usage(self):
+        return _size(self.root)
+
+    def enforce_budget(self):
+        # Oldest raw days first, then oldest hourly months, then drop the
+        # oldest daily years, until usage fits the budget. Usage is walked
+        # once and then adjusted by what each step frees or adds.
+        with self._lock:
+            usage = self.disk_usage()
+            for tier in TIERS:
+                candidates = sorted(
+                    (name, location, series)
+                    for location in self.locations() for series in SERIES
+                    for name in self.partitions(location, series, tier))
+                for name, location, series in candidates:
+                    if usage <= self.budget_bytes:
+                        return usage
+                    if tier == "daily":
+                        path = self._dir(location, series, tier, name)
+                        usage -= _size(path)
+                        shutil.rmtree(path, ignore_errors=True)
+                    else:
+                        usage += self._fold(location, series, tier, name)
+            return usage
+
+    def maintain(self, now=None):
+        self.compact(now)
+        return self.enforce_budget()
+
+
+def simulate(root, locations, years, interval=600, budget_mb=256):
+    # Feeds synthetic 10-minute observations, compacting once per simulated
+    # day like the app does, then times range queries.
+    store = HistoryStore(root, budget_bytes=budget_mb * 2 ** 20)
+    rng = np.random.default_rng(0)
+    end = (int(time.time()) // 86400) * 86400
+    start = end - int(years * 365) * 86400
+    t0 = time.perf_counter()
+    for day in range(start, end, 86400):
+        ts = np.arange(day, day + 86400, interval)
+        phase = 2 * np.pi * (ts % 86400) / 86400
+        for i in range(locations):
+            temp = 12 + 8 * np.sin(phase) + rng.normal(0, 1, len(ts))
+            store.append(f"loc{i:03d}", "current", ts, temp=temp,
+                         feels_like=temp - 1, humidity=rng.uniform(30, 90, len(ts)),
+                         wind=rng.uniform(0, 12, len(ts)))
+        store.maintain(now=day + 86400)
+    elapsed = time.perf_counter() - t0
+    samples = locations * (end - start) // interval
+    print(f"{samples:,} samples for {locations} locations over {years} years "
+          f"in {elapsed:.1f} s; on disk {store.disk_usage() / 2 ** 20:.2f} MiB "
+          f"(budget {budget_mb} MiB)")
+    for label, span, resolution in (("7 days", 7, "hourly"),
+                                    ("30 days", 30, "hourly"),
+                                    ("1 year", 365, "daily"),
+                                    (f"{years} years", int(years * 365), "daily")):
+        q0 = time.perf_counter()
+        rows = store.query("loc000", "current", end - span * 86400, end, resolution)
+        print(f"  query {label:>9} @ {resolution:6}: {len(rows['ts']):5d} rows "
+              f"in {(time.perf_counter() - q0) * 1000:6.1f} ms")
+
+
+def main():
+    import argparse
+    import tempfile
+    parser = argparse.ArgumentParser(description="Weather history store tools")
+    parser.add_argument("--simulate", action="store_true")
+    parser.add_argument("--locations", type=int, default=10)
+    parser.add_argument("--years", type=float, default=1)
+    parser.add_argument("--budget-mb", type=int, default=256)
+    parser.add_argument("--root", help="store directory (default: temporary)")
+    args = parser.parse_args()
+    if not args.simulate:
+        parser.error("nothing to do (try --simulate)")
+    root = args.root or tempfile.mkdtemp(prefix="weather-history-")
+    simulate(root, args.locations, args.years, budget_mb=args.budget_mb)
+    if not args.root:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
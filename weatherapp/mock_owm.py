@@ -0,0 +1,298 @@
+"""Local stand-in for the network services used by the weather app.
+
+Serves the OpenWeatherMap geocoding, current weather, forecast and icon
+endpoints plus the ipapi.co lookup, with configurable latency, error
+rate and per-minute rate limit, and counts the requests it receives.
+
+Responses are replayed from a directory of recorded payloads when one is
+given (geocode.json, weather.json, forecast.json, ipapi.json, icons/*.png)
+and synthesised otherwise. Record a set from the live API with:
+
+    python mock_owm.py --record fixtures --api-key KEY --city London
+
+Serve:
+    python mock_owm.py --port 8765 --latency 0.05 --error-rate 0.02 \\
+        --rate-limit 60 --payloads fixtures
+"""
+
+import json
+import math
+import os
+import random
+import struct
+import threading
+import time
+import zlib
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+ENDPOINTS = {
+    "/geo/1.0/direct": "geocode",
+    "/data/2.5/weather": "weather",
+    "/data/2.5/forecast": "forecast",
+    "/json/": "ipapi",
+}
+
+
+def _weather_item(lat, lon, dt, step=0, units="metric"):
+    temp = 15 + 10 * math.sin(math.radians(lat)) + 3 * math.sin(step / 4)
+    wind = 2 + abs(lon) % 5
+    if units == "imperial":
+        temp, wind = temp * 9 / 5 + 32, wind / 0.44704
+    feels = temp - (1.8 if units == "imperial" else 1)
+    return {
+        "dt": dt,
+        "main": {"temp": round(temp, 2), "feels_like": round(feels, 2),
+                 "humidity": 60 + step % 20},
+        "weather": [{"icon": "01d" if step % 8 < 4 else "01n",
+                     "description": "clear sky"}],
+        "wind": {"speed": round(wind, 1)},
+    }
+
+
+def current_payload(lat, lon, units="metric"):
+    item = _weather_item(lat, lon, int(time.time()), units=units)
+    item.update({"coord": {"lat": lat, "lon": lon}, "name": "Mock"})
+    return item
+
+
+def forecast_payload(lat, lon, units="metric"):
+    start = int(time.time()) // 10800 * 10800
+    return {"cnt": 40, "list": [_weather_item(lat, lon, start + i * 10800, i,
+                                              units)
+                                for i in range(40)]}
+
+
+def geocode_payload(query):
+    name = query.split(",")[0].strip().title() or "Mock"
+    seed = zlib.crc32(name.encode())
+    return [{"name": name, "country": "XX",
+             "lat": round(seed % 14000 / 100 - 60, 4),
+             "lon": round(seed // 14000 % 36000 / 100 - 180, 4)}]
+
+
+def ipapi_payload():
+    return {"latitude": 51.5072, "longitude": -0.1276, "city": "London",
+            "country_name": "United Kingdom"}
+
+
+def icon_png(icon, size=100):
+    # Solid-colour RGBA PNG, different per icon code.
+    r, g, b = (zlib.crc32(icon.encode()) >> shift & 0xFF for shift in (0, 8, 16))
+    row = b"\0" + bytes((r, g, b, 255)) * size
+    raw = zlib.compress(row * size)
+
+    def chunk(kind, data):
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + \
+            struct.pack(">I", zlib.crc32(body))
+
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", size, size, 8, 6, 0, 0, 0))
+            + chunk(b"IDAT", raw) + chunk(b"IEND", b""))
+
+
+class MockOWMServer:
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, error_rate=0.0,
+                 rate_limit=None, payloads=None, seed=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.payloads = payloads
+        self.requests = 0
+        self.by_endpoint = Counter()
+        self.errors = 0
+        self.throttled = 0
+        self._recent = deque()
+        self._random = random.Random(seed)
+        self._recorded = {}
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def reset_counters(self):
+        with self._lock:
+            self.requests = self.errors = self.throttled = 0
+            self.by_endpoint.clear()
+
+    def _admit(self, endpoint):
+        # Returns an HTTP error status, or None to serve the request.
+        with self._lock:
+            self.requests += 1
+            self.by_endpoint[endpoint] += 1
+            if self.rate_limit:
+                now = time.monotonic()
+                while self._recent and now - self._recent[0] >= 60:
+                    self._recent.popleft()
+                if len(self._recent) >= self.rate_limit:
+                    self.throttled += 1
+                    return 429
+                self._recent.append(now)
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.errors += 1
+                return 500
+        return None
+
+    def _recording(self, name):
+        if not self.payloads:
+            return None
+        if name not in self._recorded:
+            path = os.path.join(self.payloads, name)
+            try:
+                with open(path, "rb") as f:
+                    self._recorded[name] = f.read()
+            except OSError:
+                self._recorded[name] = None
+        return self._recorded[name]
+
+    def _body(self, endpoint, q):
+        recorded = self._recording(f"{endpoint}.json")
+        if recorded is not None:
+            return recorded
+        if endpoint == "geocode":
+            return geocode_payload(q.get("q", [""])[0])
+        if endpoint == "ipapi":
+            return ipapi_payload()
+        lat, lon = float(q["lat"][0]), float(q["lon"][0])
+        units = q.get("units", ["metric"])[0]
+        if endpoint == "weather":
+            return current_payload(lat, lon, units)
+        return forecast_payload(lat, lon, units)
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                q = parse_qs(url.query)
+                icon = None
+                if url.path.startswith("/img/wn/") and url.path.endswith("@2x.png"):
+                    endpoint = "icon"
+                    icon = url.path[len("/img/wn/"):-len("@2x.png")]
+                else:
+                    endpoint = ENDPOINTS.get(url.path)
+                if endpoint is None:
+                    return self._send_json(404, {"cod": 404, "message": "not found"})
+                status = server._admit(endpoint)
+                if server.latency:
+                    time.sleep(server.latency)
+                if status == 429:
+                    return self._send_json(429, {"cod": 429, "message":
+                                                 "rate limit exceeded"})
+                if status:
+                    return self._send_json(status, {"cod": status,
+                                                    "message": "mock failure"})
+                if icon is not None:
+                    png = server._recording(os.path.join("icons", f"{icon}.png"))
+                    return self._send(200, "image/png", png or icon_png(icon))
+                try:
+                    body = server._body(endpoint, q)
+                except (KeyError, ValueError):
+                    return self._send_json(400, {"cod": 400, "message": "bad query"})
+                if isinstance(body, bytes):
+                    return self._send(200, "application/json", body)
+                self._send_json(200, body)
+
+            def _send_json(self, status, body):
+                self._send(status, "application/json", json.dumps(body).encode())
+
+            def _send(self, status, content_type, data):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever,
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def patch_app(self, app):
+        # Point a loaded weather app module at this server.
+        app.OWM_GEOCODE_URL = f"{self.base_url}/geo/1.0/direct"
+        app.OWM_CURRENT_URL = f"{self.base_url}/data/2.5/weather"
+        app.OWM_FORECAST_URL = f"{self.base_url}/data/2.5/forecast"
+        app.OWM_ICON_URL = self.base_url + "/img/wn/{icon}@2x.png"
+        app.IP_GEO_URL = f"{self.base_url}/json/"
+
+
+def record(out_dir, api_key, city):
+    import requests
+    os.makedirs(os.path.join(out_dir, "icons"), exist_ok=True)
+
+    def save(name, url, params=None):
+        r = requests.get(url, params=params, timeout=15)
+        r.raise_for_status()
+        with open(os.path.join(out_dir, name), "wb") as f:
+            f.write(r.content)
+        return r
+
+    geo = save("geocode.json", "http://api.openweathermap.org/geo/1.0/direct",
+               {"q": city, "limit": 1, "appid": api_key}).json()[0]
+    params = {"lat": geo["lat"], "lon": geo["lon"], "units": "metric",
+              "appid": api_key}
+    save("weather.json", "https://api.openweathermap.org/data/2.5/weather", params)
+    forecast = save("forecast.json",
+                    "https://api.openweathermap.org/data/2.5/forecast",
+                    params).json()
+    save("ipapi.json", "https://ipapi.co/json/")
+    icons = {i["weather"][0]["icon"] for i in forecast["list"]}
+    for icon in sorted(icons):
+        save(os.path.join("icons", f"{icon}.png"),
+             f"http://openweathermap.org/img/wn/{icon}@2x.png")
+    print(f"Recorded {city} ({len(icons)} icons) into {out_dir}")
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Mock OpenWeatherMap server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="seconds to sleep before each response")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="fraction of requests answered with HTTP 500")
+    parser.add_argument("--rate-limit", type=int, default=None,
+                        help="requests per minute before answering HTTP 429")
+    parser.add_argument("--payloads", help="directory of recorded payloads")
+    parser.add_argument("--record", metavar="DIR",
+                        help="record live payloads into DIR and exit")
+    parser.add_argument("--api-key")
+    parser.add_argument("--city", default="London")
+    args = parser.parse_args()
+
+    if args.record:
+        if not args.api_key:
+            parser.error("--record needs --api-key")
+        return record(args.record, args.api_key, args.city)
+    server = MockOWMServer(args.host, args.port, args.latency,
+                           args.error_rate, args.rate_limit, args.payloads)
+    print(f"Serving mock OpenWeatherMap on {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
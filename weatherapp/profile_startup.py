@@ -0,0 +1,123 @@
+"""Import-time and cold-start profile for the weather app.
+
+Usage:
+    python profile_startup.py [--top N] [--window]
+
+Runs each measurement in a fresh interpreter so nothing is already
+imported. --window also times WeatherApp() up to the first drawn frame
+(needs a display).
+
+The app module import is compared against BASELINE_IMPORTS, the
+top-level imports the module had before they were made lazy.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        "OIBSIP Python task 3. weatherapp.py")
+
+LOAD_APP = (
+    "import importlib.util, sys\n"
+    f"sys.path.insert(0, {os.path.dirname(APP_PATH)!r})\n"
+    f"spec = importlib.util.spec_from_file_location('weatherapp', {APP_PATH!r})\n"
+    "mod = importlib.util.module_from_spec(spec)\n"
+    "sys.modules['weatherapp'] = mod\n"
+    "spec.loader.exec_module(mod)\n"
+)
+
+BASELINE_IMPORTS = (
+    "import tkinter as tk\n"
+    "from tkinter import ttk, messagebox\n"
+    "from PIL import Image, ImageTk\n"
+    "import requests\n"
+    "import io, time, threading\n"
+    "from datetime import datetime\n"
+    "from matplotlib.figure import Figure\n"
+    "from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg\n"
+)
+
+FIRST_WINDOW = LOAD_APP + (
+    "import time\n"
+    "t0 = time.perf_counter()\n"
+    "app = mod.WeatherApp()\n"
+    "app.update()\n"
+    "print(f'{time.perf_counter() - t0:.6f}')\n"
+    "app.destroy()\n"
+)
+
+
+def run_python(code, *flags):
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, *flags, "-c", code],
+                          capture_output=True, text=True)
+    return proc, time.perf_counter() - start
+
+
+def parse_importtime(stderr):
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|")
+        rows.append((int(cumulative_us), int(self_us), name[1:].rstrip()))
+    return rows
+
+
+def profile_imports(code, top):
+    proc, _ = run_python(code, "-X", "importtime")
+    if proc.returncode != 0:
+        return None, proc.stderr.strip().splitlines()[-1]
+    rows = parse_importtime(proc.stderr)
+    top_level = [r for r in rows if not r[2].startswith(" ")]
+    total = sum(r[0] for r in top_level)
+    return (total, sorted(rows, reverse=True)[:top]), None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--window", action="store_true")
+    args = parser.parse_args()
+
+    result, err = profile_imports(LOAD_APP, args.top)
+    if err:
+        print(f"App module import failed: {err}")
+        return 1
+    total, rows = result
+    print(f"App module import (before window): {total / 1000:.1f} ms")
+    baseline, err = profile_imports(BASELINE_IMPORTS, 0)
+    if err:
+        print(f"Eager baseline imports: not available ({err})")
+    else:
+        saved = baseline[0] - total
+        print(f"Eager baseline imports:            {baseline[0] / 1000:.1f} ms "
+              f"({saved / 1000:.1f} ms, {saved / baseline[0]:.0%} saved)")
+    for cumulative, own, name in rows:
+        print(f"  {cumulative / 1000:8.1f} ms  {own / 1000:8.1f} ms  {name}")
+
+    print("\nDeferred imports (loaded lazily / by background warm-up):")
+    for name in ("requests", "PIL.ImageTk", "matplotlib.figure",
+                 "matplotlib.backends.backend_tkagg"):
+        result, err = profile_imports(f"import {name}", 0)
+        if err:
+            print(f"  {name:36} not available ({err})")
+        else:
+            print(f"  {name:36} {result[0] / 1000:8.1f} ms")
+
+    if args.window:
+        proc, wall = run_python(FIRST_WINDOW)
+        if proc.returncode != 0:
+            print(f"\nFirst window: failed ({proc.stderr.strip().splitlines()[-1]})")
+        else:
+            print(f"\nFirst window drawn after {float(proc.stdout) * 1000:.1f} ms"
+                  f" (process wall time {wall * 1000:.1f} ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+"""In-process latency telemetry for the weather app.
+
+`with span("stage"):` times a block into a per-stage histogram. Each
+histogram keeps cumulative Prometheus-style buckets plus a window of
+recent samples for exact p50/p95. Exceptions raised inside a span are
+counted as errors for that stage and re-raised.
+
+Export with write_metrics(path) (Prometheus text format) or
+serve_metrics(port), which serves /metrics on localhost.
+"""
+
+import bisect
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+           0.5, 1.0, 2.5, 5.0, 10.0)
+RECENT_SAMPLES = 512
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.errors = 0
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, error=False):
+        with self._lock:
+            self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+            self.total += seconds
+            self.count += 1
+            self.errors += error
+            self.recent.append(seconds)
+
+    def quantiles(self, *qs):
+        with self._lock:
+            samples = sorted(self.recent)
+        if not samples:
+            return tuple(None for _ in qs)
+        return tuple(samples[min(len(samples) - 1, int(q * len(samples)))]
+                     for q in qs)
+
+
+_histograms = {}
+_registry_lock = threading.Lock()
+
+
+def histogram(stage):
+    h = _histograms.get(stage)
+    if h is None:
+        with _registry_lock:
+            h = _histograms.setdefault(stage, Histogram())
+    return h
+
+
+def observe(stage, seconds, error=False):
+    histogram(stage).observe(seconds, error)
+
+
+@contextmanager
+def span(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        observe(stage, time.perf_counter() - start, error=True)
+        raise
+    observe(stage, time.perf_counter() - start)
+
+
+def snapshot():
+    # {stage: {"count", "errors", "mean", "p50", "p95"}} in seconds.
+    with _registry_lock:
+        items = sorted(_histograms.items())
+    stats = {}
+    for stage, h in items:
+        p50, p95 = h.quantiles(0.5, 0.95)
+        stats[stage] = {"count": h.count, "errors": h.errors,
+                        "mean": h.total / h.count if h.count else None,
+                        "p50": p50, "p95": p95}
+    return stats
+
+
+def reset():
+    with _registry_lock:
+        _histograms.clear()
+
+
+def prometheus_text(prefix="weatherapp"):
+    with _registry_lock:
+        items = sorted(_histograms.items())
+    lines = [f"# HELP {prefix}_stage_seconds Time spent per app stage.",
+             f"# TYPE {prefix}_stage_seconds histogram"]
+    errors = [f"# HELP {prefix}_stage_errors_total Failed spans per stage.",
+              f"# TYPE {prefix}_stage_errors_total counter"]
+    for stage, h in items:
+        with h._lock:
+            counts, total, count, failed = list(h.counts), h.total, h.count, h.errors
+        label = f'stage="{stage}"'
+        cumulative = 0
+        for bound, n in zip(BUCKETS + (float("inf"),), counts):
+            cumulative += n
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'{prefix}_stage_seconds_bucket{{{label},le="{le}"}} '
+                         f"{cumulative}")
+        lines.append(f"{prefix}_stage_seconds_sum{{{label}}} {total:.6f}")
+        lines.append(f"{prefix}_stage_seconds_count{{{label}}} {count}")
+        errors.append(f"{prefix}_stage_errors_total{{{label}}} {failed}")
+    return "\n".join(lines + errors) + "\n"
+
+
+def write_metrics(path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(prometheus_text())
+    os.replace(tmp, path)
+
+
+def serve_metrics(port, host="127.0.0.1"):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = prometheus_text().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True,
+                     name="metrics").start()
+    return httpd
@@ -0,0 +1,34 @@
+import pytest
+
+from weather_service import load_app
+
+pytest.importorskip("matplotlib")
+
+
+def test_relayout_only_when_axis_text_changes():
+    from matplotlib.figure import Figure
+    app = load_app()
+    fig = Figure(figsize=(7.5, 2.5), dpi=100)
+    ax = fig.add_subplot(111)
+    line, = ax.plot([], [])
+    calls = []
+    fig.tight_layout = lambda **kw: calls.append(kw)
+    chart = {"fig": fig, "ax": ax, "line": line, "layout": None}
+
+    def render(temps, labels, unit):
+        line.set_data(range(len(temps)), temps)
+        ax.set_xticks(range(len(labels)))
+        ax.set_xticklabels(labels)
+        ax.set_ylabel(f"Temperature ({unit})")
+        ax.relim()
+        ax.autoscale_view()
+        app.WeatherApp._relayout(None, chart)
+
+    labels = [f"{h}PM" for h in range(1, 9)]
+    render([20, 21, 22, 21, 20, 19, 19, 18], labels, "°C")
+    render([20, 21.5, 22, 21, 20, 19, 18.5, 18], labels, "°C")
+    assert len(calls) == 1
+    render([68, 70, 72, 70, 68, 66, 66, 65], labels, "°F")
+    assert len(calls) == 2
+    render([68, 70, 72, 70, 68, 66, 66, 65], labels[1:] + ["9PM"], "°F")
+    assert len(calls) == 3
@@ -0,0 +1,72 @@
+import pytest
+
+from city_index import CityIndex, build_index, normalize, open_city_index
+
+
+ROWS = [
+    ("London", "London", 51.5085, -0.1257, "GB", 8961989),
+    ("London", "London", 42.9834, -81.233, "CA", 346765),
+    ("Londrina", "Londrina", -23.3103, -51.1628, "BR", 575377),
+    ("Łódź", "Lodz", 51.7706, 19.4739, "PL", 768755),
+    ("Zürich", "Zurich", 47.3667, 8.55, "CH", 341730),
+]
+
+
+def geonames_line(name, ascii_name, lat, lon, country, population):
+    cols = [""] * 19
+    cols[1], cols[2], cols[4], cols[5] = name, ascii_name, str(lat), str(lon)
+    cols[8], cols[14] = country, str(population)
+    return "\t".join(cols) + "\n"
+
+
+@pytest.fixture
+def index(tmp_path):
+    path = str(tmp_path / "cities.idx")
+    build_index([geonames_line(*row) for row in ROWS], path)
+    index = CityIndex(path)
+    yield index
+    index.close()
+
+
+def test_normalize():
+    assert normalize("  Zürich ") == "zurich"
+    assert normalize("ŁÓDŹ") == normalize("Łódź")
+
+
+def test_complete_ranks_by_population(index):
+    assert [c["label"] for c in index.complete("lon")] == \
+        ["London, GB", "Londrina, BR", "London, CA"]
+    assert [c["label"] for c in index.complete("LON", limit=1)] == ["London, GB"]
+    assert index.complete("zu")[0]["name"] == "Zürich"
+    assert index.complete("x") == []
+    assert index.complete("") == []
+
+
+def test_complete_dedupes_ascii_and_native_names(index):
+    assert [c["label"] for c in index.complete("lod")] == ["Łódź, PL"]
+
+
+def test_resolve(index):
+    assert index.resolve("london")["country"] == "GB"
+    assert index.resolve("London, ca")["lat"] == pytest.approx(42.9834, abs=1e-3)
+    assert index.resolve("Lodz")["label"] == "Łódź, PL"
+    assert index.resolve("Lond") is None
+    assert index.resolve("London, FR") is None
+
+
+def test_build_counts_and_min_population(tmp_path):
+    path = str(tmp_path / "big.idx")
+    lines = [geonames_line(*row) for row in ROWS] + ["short\tline\n"]
+    assert build_index(lines, path, min_population=500000) == (3, 4)
+    index = CityIndex(path)
+    assert [c["label"] for c in index.complete("lo")] == \
+        ["London, GB", "Łódź, PL", "Londrina, BR"]
+    assert index.resolve("Zurich") is None
+    index.close()
+
+
+def test_open_city_index_tolerates_missing_or_bad_file(tmp_path):
+    assert open_city_index(str(tmp_path / "missing.idx")) is None
+    bad = tmp_path / "bad.idx"
+    bad.write_bytes(b"not an index at all")
+    assert open_city_index(str(bad)) is None
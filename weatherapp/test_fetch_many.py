@@ -0,0 +1,41 @@
+from mock_owm import MockOWMServer
+from weather_service import load_app
+
+
+def test_rate_limiter_holds_quota():
+    app = load_app()
+    for quota in (1, 3, 60):
+        limiter = app.RateLimiter(quota)
+        waits = [limiter.reserve() for _ in range(3 * quota)]
+        assert waits[:quota] == [0.0] * quota
+        starts = sorted(waits)
+        for i in range(len(starts) - quota):
+            assert starts[i + quota] - starts[i] >= limiter.window - 0.01
+
+
+def test_fetch_many_returns_every_location(app, server):
+    locations = [{"name": f"p{i}", "lat": 10 + i, "lon": 20} for i in range(5)]
+    results = app.fetch_many(locations, max_concurrency=3)
+    assert [r["name"] for r in results] == [f"p{i}" for i in range(5)]
+    assert all(r["error"] is None and r["current"] and r["forecast"]
+               for r in results)
+    assert server.requests == 10
+
+
+def test_fetch_many_runs_by_priority(app):
+    locations = [{"name": f"p{i}", "lat": 10 + i, "lon": 20, "priority": -i}
+                 for i in range(4)]
+    order = []
+    app.fetch_many(locations, max_concurrency=1,
+                   on_result=lambda r: order.append(r["name"]))
+    assert order == ["p3", "p2", "p1", "p0"]
+
+
+def test_fetch_many_reports_errors_per_location(app):
+    failing = MockOWMServer(error_rate=1.0).start()
+    try:
+        failing.patch_app(app)
+        results = app.fetch_many([{"lat": 1, "lon": 2}, {"lat": 3, "lon": 4}])
+    finally:
+        failing.stop()
+    assert all(r["current"] is None and "500" in r["error"] for r in results)
@@ -0,0 +1,39 @@
+from datetime import date, datetime
+
+from weather_service import load_app
+
+
+def test_forecast_table_daily():
+    app = load_app()
+    midnight = int(datetime(2024, 1, 10).timestamp())
+    items = [{"dt": midnight + i * 10800,
+              "main": {"temp": float(i), "humidity": 50},
+              "wind": {"speed": i % 3},
+              "weather": [{"icon": "01d", "description": f"d{i}"}]}
+             for i in range(16)]
+    table = app.ForecastTable.from_json({"list": items})
+    days = table.daily()
+    assert [d["date"] for d in days] == [date(2024, 1, 10), date(2024, 1, 11)]
+    assert (days[0]["tmin"], days[0]["tmax"], days[0]["tmean"]) == (0, 7, 3.5)
+    assert (days[1]["tmin"], days[1]["tmax"]) == (8, 15)
+    assert days[1]["wind_max"] == 2
+    assert days[1]["desc"] == "d8"
+    assert len(table.hourly(5)) == 5
+    assert len(table.daily(limit=1)) == 1
+    both = app.ForecastTable.concat([table, app.ForecastTable.from_json(
+        {"list": items}, loc=1)])
+    assert [d["loc"] for d in both.daily()] == [0, 0, 1, 1]
+
+
+def test_forecast_table_empty_and_labels():
+    app = load_app()
+    empty = app.ForecastTable.from_json({})
+    assert len(empty) == 0
+    assert empty.daily() == []
+    noon = int(datetime(2024, 1, 10, 12).timestamp())
+    table = app.ForecastTable.from_json({"list": [
+        {"dt": noon + i * 10800, "main": {"temp": 1.0},
+         "weather": [{"icon": "01d"}]} for i in range(3)]})
+    assert table.hour_labels() == ["12 PM", "03 PM", "06 PM"]
+    assert table.hour_labels(sep="\n")[0] == "12\nPM"
+    assert list(table.humidity) == [0, 0, 0]
@@ -0,0 +1,94 @@
+import os
+
+import numpy as np
+
+from history_store import HistoryStore, aggregate
+
+
+DAY = 86400
+NOW = 1_700_006_400   # a UTC midnight
+
+
+def fill(store, days, interval=600, location="cell"):
+    ts = np.arange(NOW - days * DAY, NOW, interval)
+    temp = (ts % DAY / 3600).astype(np.float32)   # hour of day
+    store.append(location, "current", ts, temp=temp, feels_like=temp - 1,
+                 humidity=np.full(len(ts), 50.0), wind=np.full(len(ts), 3.0))
+    return ts, temp
+
+
+def test_aggregate_hourly():
+    ts = np.arange(0, 7200, 600)
+    rows = {"ts": ts, "temp": np.arange(12, dtype=np.float32)}
+    rows.update(feels_like=rows["temp"], humidity=rows["temp"],
+                wind=rows["temp"])
+    out = aggregate(rows, "current", 3600)
+    assert list(out["ts"]) == [0, 3600]
+    assert list(out["count"]) == [6, 6]
+    assert list(out["temp"]) == [2.5, 8.5]
+    assert list(out["temp_min"]) == [0, 6]
+    assert list(out["temp_max"]) == [5, 11]
+
+
+def test_query_raw_range(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    ts, temp = fill(store, 3)
+    rows = store.query("cell", "current", NOW - DAY, NOW, "raw")
+    assert list(rows["ts"]) == list(ts[ts >= NOW - DAY])
+    assert np.allclose(rows["temp"], temp[ts >= NOW - DAY])
+
+
+def test_compact_keeps_query_results(tmp_path):
+    store = HistoryStore(str(tmp_path), raw_days=2, hourly_days=10)
+    fill(store, 30)
+    before = {res: store.query("cell", "current", NOW - 30 * DAY, NOW, res)
+              for res in ("hourly", "daily")}
+    assert store.compact(now=NOW) > 0
+    assert store.partitions("cell", "current", "raw") == \
+        ["2023-11-13", "2023-11-14"]
+    assert store.partitions("cell", "current", "daily")
+    after = store.query("cell", "current", NOW - 30 * DAY, NOW, "daily")
+    for col in ("ts", "count", "temp", "temp_min", "temp_max"):
+        assert np.allclose(before["daily"][col], after[col])
+    recent = store.query("cell", "current", NOW - DAY, NOW, "hourly")
+    assert len(recent["ts"]) == 24
+    assert np.allclose(recent["temp"], np.arange(24) + 5 / 12)
+
+
+def test_enforce_budget(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    for i in range(3):
+        fill(store, 20, location=f"cell{i}")
+    store.budget_bytes = store.disk_usage() // 3
+    assert store.maintain(now=NOW) <= store.budget_bytes
+    assert store.disk_usage() <= store.budget_bytes
+    rows = store.query("cell0", "current", NOW - DAY, NOW, "hourly")
+    assert len(rows["ts"]) == 24
+
+
+def test_disk_usage_counts_allocated_blocks(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    store.append("cell", "current", NOW, temp=1.0, feels_like=1.0,
+                 humidity=1.0, wind=1.0)
+    files = os.listdir(os.path.join(str(tmp_path), "cell", "current", "raw",
+                                    "2023-11-15"))
+    assert len(files) == 5
+    assert store.disk_usage() >= 5 * 512
+
+
+def test_record_history_dedupes_across_units(app):
+    def observation(dt, temp, wind):
+        return {"dt": dt, "main": {"temp": temp, "humidity": 50},
+                "wind": {"speed": wind}}
+
+    app.record_history("current", "current:gcpvj0:metric",
+                       observation(NOW - 600, 12.34, 3.0))
+    app.record_history("current", "current:gcpvj0:imperial",
+                       observation(NOW - 600, 54.21, 6.71))
+    app.record_history("current", "current:gcpvj0:imperial",
+                       observation(NOW, 55.0, 6.71))
+    rows = app.history_store().query("gcpvj0", "current", NOW - DAY, NOW + 1,
+                                     "raw")
+    assert list(rows["ts"]) == [NOW - 600, NOW]
+    assert np.allclose(rows["temp"], [12.34, 12.78], atol=0.01)
+    assert np.allclose(rows["wind"], [3.0, 3.0], atol=0.01)
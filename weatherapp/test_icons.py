@@ -0,0 +1,27 @@
+import os
+
+import pytest
+
+pytest.importorskip("PIL")
+
+
+def test_icon_is_cached_on_disk(app, server):
+    image = app.load_icon_image("01d", (50, 50))
+    assert image.size == (50, 50)
+    assert os.listdir(app.ICON_CACHE_DIR) == ["01d_50x50.png"]
+    app._cache.clear()
+    assert app.load_icon_image("01d", (50, 50)).size == (50, 50)
+    assert server.by_endpoint["icon"] == 1
+
+
+def test_prefetch_loads_every_icon_once(app, server):
+    current = app.fetch_current_weather(51.5, -0.12)
+    table = app.ForecastTable.from_json(app.fetch_forecast(51.5, -0.12))
+    app.prefetch_icons(current, table)
+    loaded = {k for k in app._cache if k.startswith("iconsrc:")}
+    assert f"iconsrc:{current['weather'][0]['icon']}:(100, 100)" in loaded
+    assert {f"iconsrc:{code}:(50, 50)"
+            for code in table.icon[:app.HOURLY_SLOTS]} <= loaded
+    assert server.by_endpoint["icon"] == len(loaded)
+    app.prefetch_icons(current, table)
+    assert server.by_endpoint["icon"] == len(loaded)
@@ -0,0 +1,24 @@
+import pytest
+
+from mock_owm import current_payload, forecast_payload
+
+
+def test_imperial_payloads_are_converted():
+    metric, imperial = current_payload(40, 3), current_payload(40, 3, "imperial")
+    assert imperial["main"]["temp"] == \
+        pytest.approx(metric["main"]["temp"] * 9 / 5 + 32, abs=0.02)
+    assert imperial["main"]["feels_like"] == \
+        pytest.approx(metric["main"]["feels_like"] * 9 / 5 + 32, abs=0.02)
+    assert imperial["wind"]["speed"] == \
+        pytest.approx(metric["wind"]["speed"] / 0.44704, abs=0.1)
+    hot = forecast_payload(40, 3, "imperial")["list"]
+    assert [i["main"]["temp"] for i in hot] == pytest.approx(
+        [i["main"]["temp"] * 9 / 5 + 32
+         for i in forecast_payload(40, 3)["list"]], abs=0.02)
+
+
+def test_server_honours_units(app):
+    metric = app.fetch_current_weather(40, 3)
+    imperial = app.fetch_current_weather(40, 3, "imperial")
+    assert imperial["main"]["temp"] == \
+        pytest.approx(metric["main"]["temp"] * 9 / 5 + 32, abs=0.02)
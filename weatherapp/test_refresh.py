@@ -0,0 +1,35 @@
+POLICIES = {"geocode": {"ttl": 600, "stale": 3600, "refresh_ahead": 60,
+                        "jitter": 30}}
+
+
+def test_refresh_ahead_is_jittered(app):
+    sched = app.RefreshScheduler(POLICIES)
+    ts = app.time.time()
+    for i in range(20):
+        key = f"geocode:q{i}:1"
+        app._cache[key] = {"ts": ts, "data": [i]}
+        sched.register("geocode", key, lambda: None)
+        sched.subscribe(key, lambda *a: None)
+    dues = [sched._due[f"geocode:q{i}:1"] - ts for i in range(20)]
+    assert all(600 - 60 - 30 <= due <= 600 - 60 for due in dues)
+    assert len(set(dues)) > 1
+
+
+def test_listeners_hear_only_changes(app):
+    sched = app.RefreshScheduler(POLICIES)
+    key = "geocode:london:1"
+    # Fetched recently, so the scheduler thread itself stays idle.
+    app._cache[key] = {"ts": app.time.time() - 100, "data": ["A"]}
+    answers = iter([["A"], ["B"], None])
+    sched.register("geocode", key, lambda: next(answers))
+    heard = []
+    sched.subscribe(key, lambda k, data: heard.append(data))
+    sched._refresh(key)
+    assert heard == []
+    assert app._cache[key]["ts"] > app.time.time() - 100
+    sched._refresh(key)
+    assert heard == [["B"]]
+    sched._refresh(key)
+    assert heard == [["B"]]
+    assert app._cache[key]["data"] == ["B"]
+    assert sched._due[key] - app.time.time() <= 60
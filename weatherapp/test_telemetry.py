@@ -0,0 +1,48 @@
+import pytest
+
+import telemetry
+
+
+@pytest.fixture(autouse=True)
+def clean():
+    telemetry.reset()
+    yield
+    telemetry.reset()
+
+
+def test_quantiles():
+    h = telemetry.Histogram()
+    assert h.quantiles(0.5, 0.95) == (None, None)
+    for ms in range(1, 101):
+        h.observe(ms / 1000)
+    assert h.quantiles(0.5, 0.95, 1.0) == (0.051, 0.096, 0.1)
+    for _ in range(telemetry.RECENT_SAMPLES):
+        h.observe(2.0)
+    assert h.quantiles(0.0, 0.5) == (2.0, 2.0)
+    assert h.count == 100 + telemetry.RECENT_SAMPLES
+
+
+def test_span_counts_errors():
+    with telemetry.span("ok"):
+        pass
+    with pytest.raises(KeyError):
+        with telemetry.span("bad"):
+            raise KeyError("x")
+    stats = telemetry.snapshot()
+    assert (stats["ok"]["count"], stats["ok"]["errors"]) == (1, 0)
+    assert (stats["bad"]["count"], stats["bad"]["errors"]) == (1, 1)
+
+
+def test_prometheus_text():
+    for seconds in (0.0005, 0.003, 0.003, 20.0):
+        telemetry.observe("http", seconds)
+    telemetry.observe("http", 0.2, error=True)
+    lines = telemetry.prometheus_text("app").splitlines()
+    assert "# TYPE app_stage_seconds histogram" in lines
+    assert 'app_stage_seconds_bucket{stage="http",le="0.0005"} 1' in lines
+    assert 'app_stage_seconds_bucket{stage="http",le="0.005"} 3' in lines
+    assert 'app_stage_seconds_bucket{stage="http",le="10.0"} 4' in lines
+    assert 'app_stage_seconds_bucket{stage="http",le="+Inf"} 5' in lines
+    assert 'app_stage_seconds_count{stage="http"} 5' in lines
+    assert 'app_stage_seconds_sum{stage="http"} 20.206500' in lines
+    assert 'app_stage_errors_total{stage="http"} 1' in lines
@@ -0,0 +1,138 @@
+import json
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from mock_owm import MockOWMServer
+from weather_service import WeatherService, load_app, serve
+
+
+@pytest.fixture
+def service(tmp_path):
+    server = MockOWMServer(latency=0.02).start()
+    app = load_app()
+    server.patch_app(app)
+    app.HISTORY_DIR = str(tmp_path / "history")
+    app.api_quota = app.RateLimiter(10 ** 9)
+    service = WeatherService(app, city_index=False)
+    service.server = server
+    yield service
+    server.stop()
+
+
+@pytest.fixture
+def base_url(service):
+    httpd = serve(service, port=0)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def get(url):
+    try:
+        with urllib.request.urlopen(url) as r:
+            return r.status, json.loads(r.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def expire(app, kind, loc, seconds):
+    key = app.weather_cache_key(kind, loc["lat"], loc["lon"], "metric")
+    app._cache[key]["ts"] -= seconds
+
+
+def test_concurrent_clients_share_one_upstream_call(service, base_url):
+    with ThreadPoolExecutor(10) as pool:
+        results = list(pool.map(get, [f"{base_url}/weather?city=London"] * 10))
+    assert {status for status, _ in results} == {200}
+    assert dict(service.server.by_endpoint) == \
+        {"geocode": 1, "weather": 1, "forecast": 1}
+    body = results[0][1]
+    assert body["cache"]["current"]["stale"] is False
+    assert service._flights == {}
+    assert len(body["forecast"]["hourly"]) == 8
+
+
+def test_stale_entry_is_flagged_or_refused(service, base_url):
+    loc = {"name": None, "lat": 10.0, "lon": 20.0}
+    service.current(loc)
+    expire(service.app, "current", loc, 600)
+    status, body = get(f"{base_url}/current?lat=10&lon=20")
+    assert status == 200
+    assert body["cache"]["current"]["stale"] is True
+    assert body["cache"]["current"]["age"] >= 600
+    expire(service.app, "current", loc, 600)
+    status, body = get(f"{base_url}/current?lat=10&lon=20&stale=0")
+    assert body["cache"]["current"]["stale"] is False
+    assert body["cache"]["current"]["age"] < 60
+
+
+def test_bad_requests(base_url):
+    assert get(f"{base_url}/current")[0] == 400
+    assert get(f"{base_url}/current?lat=x&lon=1")[0] == 400
+    assert get(f"{base_url}/current?lat=1&lon=1&units=kelvin")[0] == 400
+    assert get(f"{base_url}/forecast?lat=1&lon=1&days=x")[0] == 400
+    assert get(f"{base_url}/nope")[0] == 404
+
+
+def test_prune_forgets_loaders_and_history_markers(service):
+    app = service.app
+    for lat in (10, 20, 30):
+        service.weather({"name": None, "lat": lat, "lon": 0})
+    assert len(app.refresher.keys()) == 6
+    assert len(app._history_last) == 6
+    assert service.prune(now=app.time.time() + 7 * 3600) == 6
+    assert app.refresher.keys() == []
+    assert app._history_last == {}
+    assert service._flights == {}
+
+
+def test_flights_serialise_callers_and_clean_up(service):
+    started, release = threading.Event(), threading.Event()
+    running = []
+
+    def slow(n):
+        running.append(n)
+        started.set()
+        release.wait(5)
+        return n
+
+    first = threading.Thread(target=service._once, args=("k", slow, 1))
+    first.start()
+    started.wait(5)
+    second = threading.Thread(target=service._once, args=("k", slow, 2))
+    second.start()
+    deadline = time.monotonic() + 5
+    while service._flights["k"][1] < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    service.prune()
+    assert running == [1]
+    assert service._flights["k"][1] == 2
+    release.set()
+    first.join(5)
+    second.join(5)
+    assert running == [1, 2]
+    assert service._flights == {}
+
+
+def test_service_runs_without_tkinter(monkeypatch, tmp_path):
+    monkeypatch.setitem(sys.modules, "tkinter", None)
+    monkeypatch.setitem(sys.modules, "tkinter.ttk", None)
+    server = MockOWMServer().start()
+    try:
+        app = load_app()
+        assert app.tk is None
+        server.patch_app(app)
+        app.HISTORY_DIR = str(tmp_path / "history")
+        result = WeatherService(app, city_index=False).weather(
+            {"name": None, "lat": 10.0, "lon": 20.0})
+    finally:
+        server.stop()
+    assert result["current"]["name"] == "Mock"
+    assert len(result["forecast"]["hourly"]) == 8
@@ -0,0 +1,75 @@
+from bench_e2e import headless_window
+
+
+def north_neighbour(app, lat, lon):
+    # A point just over the northern border of (lat, lon)'s cell.
+    _, (_, lat_hi, _, _) = app.geohash_bounds(lat, lon)
+    return lat_hi + 0.0005, lon
+
+
+def test_geohash_known_value(app):
+    assert app.geohash(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    cell, lat, lon = app.snap_to_grid(51.5, -0.12)
+    assert app.geohash(lat, lon) == cell
+
+
+def test_same_cell_shares_cache_entry(app, server):
+    app.fetch_current_weather(51.5, -0.12)
+    _, lat, lon = app.snap_to_grid(51.5, -0.12)
+    app.fetch_current_weather(lat, lon)
+    assert server.by_endpoint["weather"] == 1
+    assert app.cache_report()["hits"] == 1
+
+
+def test_nearby_cell_is_reused(app, server):
+    app.fetch_current_weather(51.5, -0.12)
+    lat, lon = north_neighbour(app, 51.5, -0.12)
+    assert app.weather_cache_key("current", lat, lon, "metric") != \
+        app.weather_cache_key("current", 51.5, -0.12, "metric")
+    app.fetch_current_weather(lat, lon)
+    assert server.by_endpoint["weather"] == 1
+    assert app.served_weather_key("current", lat, lon, "metric") == \
+        app.weather_cache_key("current", 51.5, -0.12, "metric")
+
+
+def test_far_cell_is_not_reused(app, server):
+    app.fetch_current_weather(51.5, -0.12)
+    app.fetch_current_weather(51.6, -0.12)
+    assert server.by_endpoint["weather"] == 2
+
+
+def test_nearby_hit_then_subscribe(app, server):
+    win = headless_window(app)
+    W = app.WeatherApp
+    assert win.run(W._update_weather_for, 51.5, -0.12, "A") is not None
+    lat, lon = north_neighbour(app, 51.5, -0.12)
+    assert win.run(W._update_weather_for, lat, lon, "B") is not None
+    assert "error" not in win.status_text.get().lower()
+    assert win._followed == (
+        app.weather_cache_key("current", 51.5, -0.12, "metric"),
+        app.weather_cache_key("forecast", 51.5, -0.12, "metric"))
+    assert win._history_cell == app.geohash(51.5, -0.12)
+    own = app.weather_cache_key("current", lat, lon, "metric")
+    app.refresher.subscribe(own, win._on_refreshed)
+    app.refresher.unsubscribe(own, win._on_refreshed)
+    for key in win._followed:
+        app.refresher.unsubscribe(key, win._on_refreshed)
+
+
+def test_schedule_ignores_unknown_key(app):
+    key = "current:zzzzzz:metric"
+    app.refresher.subscribe(key, lambda *a: None)
+    app.refresher.revalidate(key)
+    assert key not in app.refresher._due
+    assert all(k != key for _, k in app.refresher._heap)
+
+
+def test_stale_hits_are_not_counted_as_saved(app):
+    key = app.weather_cache_key("current", 51.5, -0.12, "metric")
+    app.fetch_current_weather(51.5, -0.12)
+    app.fetch_current_weather(51.5, -0.12)
+    app._cache[key]["ts"] -= app.CACHE_POLICIES["current"]["ttl"] + 1
+    app.fetch_current_weather(51.5, -0.12, allow_stale=True)
+    report = app.cache_report()
+    assert report["stale_hits"] == 1
+    assert report["api_calls_saved"] == 1
@@ -0,0 +1,342 @@
+"""Headless weather lookups and a local JSON service.
+
+Loads the weather app's fetch and cache layer without creating a Tk
+window, so scripts and dashboards can use geocoding, current weather and
+forecasts with no display. One `serve` process gives every client the
+same warm cache and the same upstream quota. Concurrent misses for the
+same location are coalesced into a single upstream call.
+
+    python weather_service.py lookup London --forecast
+    python weather_service.py lookup --lat 51.5 --lon -0.12 --json
+    python weather_service.py serve --port 8780
+
+Endpoints (GET, JSON; locations as ?city=NAME or ?lat=..&lon=..):
+    /geocode?q=NAME&limit=5
+    /current?city=London&units=metric
+    /forecast?city=London&days=5
+    /weather?city=London       current + forecast in one response
+    /stats                     cache hit rate, API calls, entries
+    /metrics                   Prometheus text (stage latencies)
+    /healthz
+
+Weather responses may be served from an expired cache entry while it is
+revalidated in the background; their "cache" object gives fetched_at,
+age (seconds) and stale for each part. Add stale=0 to wait for fresh
+data instead.
+
+The API key comes from --api-key or OWM_API_KEY.
+"""
+
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import telemetry
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(HERE, "OIBSIP Python task 3. weatherapp.py")
+UNITS = ("metric", "imperial")
+PRUNE_INTERVAL = 600
+ROUTES = ("/current", "/forecast", "/weather", "/geocode", "/stats",
+          "/metrics", "/healthz")
+
+
+def load_app():
+    sys.path.insert(0, HERE)
+    spec = importlib.util.spec_from_file_location("weatherapp", APP_PATH)
+    app = importlib.util.module_from_spec(spec)
+    sys.modules["weatherapp"] = app
+    spec.loader.exec_module(app)
+    return app
+
+
+class BadRequest(ValueError):
+    pass
+
+
+class WeatherService:
+    def __init__(self, app, city_index=True):
+        self.app = app
+        self.city_index = app.open_city_index() if city_index else None
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+
+    def _once(self, key, fn, *args):
+        # Callers asking for the same key wait for the first one, which
+        # leaves the result in the app cache for the rest. Each flight
+        # counts its callers and is removed by the last one out.
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = [threading.Lock(), 0]
+            flight[1] += 1
+        try:
+            with flight[0]:
+                return fn(*args)
+        finally:
+            with self._flights_lock:
+                flight[1] -= 1
+                if not flight[1]:
+                    del self._flights[key]
+
+    def geocode(self, query, limit=5):
+        key = f"geocode:{query.strip().lower()}:{limit}"
+        results = self._once(key, self.app.geocode_city, query, limit, True)
+        return [{"name": r.get("name"), "country": r.get("country"),
+                 "state": r.get("state"), "lat": r["lat"], "lon": r["lon"]}
+                for r in results]
+
+    def locate(self, city=None, lat=None, lon=None):
+        if city:
+            local = self.city_index.resolve(city) if self.city_index else None
+            if local:
+                return {"name": local["label"], "lat": local["lat"],
+                        "lon": local["lon"]}
+            r = self.geocode(city, 1)[0]
+            return {"name": f"{r['name']}, {r['country']}", "lat": r["lat"],
+                    "lon": r["lon"]}
+        if lat is None or lon is None:
+            raise BadRequest("give a city or both lat and lon")
+        try:
+            lat, lon = float(lat), float(lon)
+        except ValueError:
+            raise BadRequest("lat and lon must be numbers")
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            raise BadRequest("lat/lon out of range")
+        return {"name": None, "lat": lat, "lon": lon}
+
+    def _weather(self, kind, fetch, loc, units, allow_stale):
+        # Returns the payload and the age of the cache entry it came from.
+        if units not in UNITS:
+            raise BadRequest(f"units must be one of {', '.join(UNITS)}")
+        lat, lon = loc["lat"], loc["lon"]
+        key = self.app.weather_cache_key(kind, lat, lon, units)
+        data = self._once(key, fetch, lat, lon, units, allow_stale)
+        entry = self.app._cache.get(
+            self.app.served_weather_key(kind, lat, lon, units))
+        fetched_at = entry["ts"] if entry else time.time()
+        age = max(0.0, time.time() - fetched_at)
+        return data, {"fetched_at": int(fetched_at), "age": round(age, 1),
+                      "stale": age >= self.app.CACHE_POLICIES[kind]["ttl"]}
+
+    def current(self, loc, units="metric", allow_stale=True):
+        data, cache = self._weather("current", self.app.fetch_current_weather,
+                                    loc, units, allow_stale)
+        return {"location": loc, "units": units, "current": data,
+                "cache": {"current": cache}}
+
+    def forecast(self, loc, units="metric", days=5, allow_stale=True):
+        data, cache = self._weather("forecast", self.app.fetch_forecast, loc,
+                                    units, allow_stale)
+        table = self.app.ForecastTable.from_json(data)
+        hourly = table.hourly()
+        labels = hourly.hour_labels()
+        return {
+            "location": loc, "units": units, "cache": {"forecast": cache},
+            "hourly": [{"dt": int(hourly.dt[i]), "time": labels[i],
+                        "temp": float(hourly.temp[i]),
+                        "humidity": float(hourly.humidity[i]),
+                        "wind": float(hourly.wind[i]),
+                        "icon": str(hourly.icon[i]), "desc": hourly.desc[i]}
+                       for i in range(len(hourly))],
+            "daily": [dict({k: v for k, v in day.items() if k != "loc"},
+                           date=day["date"].isoformat())
+                      for day in table.daily(days)],
+        }
+
+    def weather(self, loc, units="metric", days=5, allow_stale=True):
+        result = self.current(loc, units, allow_stale)
+        forecast = self.forecast(loc, units, days, allow_stale)
+        result["cache"].update(forecast.pop("cache"))
+        result["forecast"] = {k: forecast[k] for k in ("hourly", "daily")}
+        return result
+
+    def stats(self):
+        return dict(self.app.cache_report(), entries=len(self.app._cache))
+
+    def prune(self, now=None):
+        # Drops entries past their stale window, together with their
+        # refresh loaders and history markers; a long-lived service would
+        # otherwise keep every location it was ever asked about.
+        app = self.app
+        now = time.time() if now is None else now
+        policies = app.CACHE_POLICIES
+        expired = [key for key, entry in list(app._cache.items())
+                   if key.split(":")[0] in policies
+                   and now - entry["ts"] > policies[key.split(":")[0]]["stale"]]
+        for key in expired:
+            app._cache.pop(key, None)
+        for key in app.refresher.keys():
+            if key not in app._cache:
+                app.refresher.drop(key)
+        live = {(key.split(":")[1], key.split(":")[0])
+                for key in list(app._cache)
+                if key.split(":")[0] in ("current", "forecast")}
+        for marker in list(app._history_last):
+            if marker not in live:
+                app._history_last.pop(marker, None)
+        return len(expired)
+
+
+def _int(q, name, default):
+    try:
+        return int(q.get(name, default))
+    except ValueError:
+        raise BadRequest(f"{name} must be an integer")
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            q = {k: v[0] for k, v in parse_qs(url.query).items()}
+            route = url.path.rstrip("/") or "/"
+            if route not in ROUTES:
+                return self._send(404, "application/json",
+                                  json.dumps({"error": "not found"}).encode())
+            try:
+                with telemetry.span(f"serve.{route[1:]}"):
+                    status, body = self._route(route, q)
+            except BadRequest as e:
+                status, body = 400, {"error": str(e)}
+            except ValueError as e:
+                status, body = 404, {"error": str(e)}
+            except RuntimeError as e:
+                status, body = 502, {"error": str(e)}
+            except Exception as e:
+                status, body = 500, {"error": str(e)}
+            if isinstance(body, str):
+                return self._send(status, "text/plain; version=0.0.4",
+                                  body.encode())
+            self._send(status, "application/json", json.dumps(body).encode())
+
+        def _route(self, route, q):
+            units = q.get("units", "metric")
+            days = _int(q, "days", 5)
+            allow_stale = q.get("stale", "1").lower() not in ("0", "false", "no")
+            if route == "/healthz":
+                return 200, {"ok": True}
+            if route == "/stats":
+                return 200, service.stats()
+            if route == "/metrics":
+                return 200, telemetry.prometheus_text()
+            if route == "/geocode":
+                if not q.get("q"):
+                    raise BadRequest("missing q")
+                return 200, service.geocode(q["q"], _int(q, "limit", 5))
+            loc = service.locate(q.get("city"), q.get("lat"), q.get("lon"))
+            if route == "/current":
+                return 200, service.current(loc, units, allow_stale)
+            if route == "/forecast":
+                return 200, service.forecast(loc, units, days, allow_stale)
+            return 200, service.weather(loc, units, days, allow_stale)
+
+        def _send(self, status, content_type, data):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def serve(service, host="127.0.0.1", port=8780):
+    httpd = ThreadingHTTPServer((host, port), make_handler(service))
+    httpd.daemon_threads = True
+
+    def maintain():
+        while True:
+            time.sleep(PRUNE_INTERVAL)
+            try:
+                service.prune()
+                service.app.maintain_history()
+            except Exception as e:
+                print(f"maintenance failed: {e!r}", file=sys.stderr)
+
+    threading.Thread(target=maintain, daemon=True, name="maintain").start()
+    return httpd
+
+
+def print_weather(result):
+    loc, current = result["location"], result["current"]
+    unit = "°C" if result["units"] == "metric" else "°F"
+    name = loc["name"] or current.get("name") or f"{loc['lat']}, {loc['lon']}"
+    weather = current["weather"][0]
+    print(f"{name}: {current['main']['temp']:.1f}{unit}, "
+          f"{weather['description']} (feels like "
+          f"{current['main'].get('feels_like', current['main']['temp']):.1f}"
+          f"{unit}, humidity {current['main'].get('humidity', 0)}%)")
+    if result["cache"]["current"]["stale"]:
+        print(f"  (cached {result['cache']['current']['age'] / 60:.0f} min ago; "
+              f"use --fresh to wait for new data)")
+    for day in result.get("forecast", {}).get("daily", []):
+        print(f"  {day['date']}  {day['tmin']:5.1f} – {day['tmax']:5.1f}{unit}  "
+              f"{day['desc']}")
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--api-key", default=os.environ.get("OWM_API_KEY"))
+    parser.add_argument("--no-city-index", action="store_true",
+                        help="always geocode through the API")
+    commands = parser.add_subparsers(dest="command", required=True)
+    lookup = commands.add_parser("lookup", help="print weather for one place")
+    lookup.add_argument("city", nargs="?")
+    lookup.add_argument("--lat", type=float)
+    lookup.add_argument("--lon", type=float)
+    lookup.add_argument("--units", choices=UNITS, default="metric")
+    lookup.add_argument("--forecast", action="store_true",
+                        help="include the daily forecast")
+    lookup.add_argument("--days", type=int, default=5)
+    lookup.add_argument("--fresh", action="store_true",
+                        help="never answer from an expired cache entry")
+    lookup.add_argument("--json", action="store_true", help="print raw JSON")
+    server = commands.add_parser("serve", help="run the JSON service")
+    server.add_argument("--host", default="127.0.0.1")
+    server.add_argument("--port", type=int, default=8780)
+    args = parser.parse_args()
+
+    app = load_app()
+    if args.api_key:
+        app.API_KEY = args.api_key
+    if not app.API_KEY:
+        parser.error("set --api-key or OWM_API_KEY")
+    service = WeatherService(app, city_index=not args.no_city_index)
+
+    if args.command == "serve":
+        httpd = serve(service, args.host, args.port)
+        host, port = httpd.server_address[:2]
+        print(f"Serving weather on http://{host}:{port}")
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return
+
+    try:
+        loc = service.locate(args.city, args.lat, args.lon)
+        if args.forecast:
+            result = service.weather(loc, args.units, args.days, not args.fresh)
+        else:
+            result = service.current(loc, args.units, not args.fresh)
+    except (ValueError, RuntimeError) as e:
+        sys.exit(f"Error: {e}")
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_weather(result)
+
+
+if __name__ == "__main__":
+    main()